@@ -1,7 +1,9 @@
 import sys
 import os
 import yaml
-import redis
+
+from string import Template
+from dino.redis_pool import get_redis
 
 
 dino_env = sys.argv[1]
@@ -13,28 +15,42 @@ if dino_env is None:
     raise RuntimeError('need environment variable DINO_ENVIRONMENT')
 
 
-def load_secrets_file(config_dict: dict) -> dict:
-    from string import Template
-    import ast
+# use the libyaml parser if available
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def load_yaml(path: str):
+    with open(path, 'rb') as f:
+        return yaml.load(f, Loader=YamlLoader)
+
 
+def substitute(value, mapping: dict):
+    if isinstance(value, str):
+        return Template(value).safe_substitute(mapping)
+    if isinstance(value, dict):
+        return {key: substitute(sub_value, mapping) for key, sub_value in value.items()}
+    if isinstance(value, list):
+        return [substitute(sub_value, mapping) for sub_value in value]
+    return value
+
+
+def load_secrets_file(config_dict: dict) -> dict:
     secrets_path = dino_home + '/secrets/%s.yaml' % dino_env
 
     # first substitute environment variables, which holds precedence over the yaml config (if it exists)
-    template = Template(str(config_dict))
-    template = template.safe_substitute(os.environ)
+    config_dict = substitute(config_dict, os.environ)
 
     if os.path.isfile(secrets_path):
         try:
-            secrets = yaml.safe_load(open(secrets_path))
+            secrets = load_yaml(secrets_path)
         except Exception as e:
             raise RuntimeError("Failed to open secrets configuration {0}: {1}".format(secrets_path, str(e)))
-        template = Template(template)
-        template = template.safe_substitute(secrets)
+        config_dict = substitute(config_dict, secrets)
 
-    return ast.literal_eval(template)
+    return config_dict
 
 
-config = yaml.safe_load(open(dino_home + '/dino.yaml'))[dino_env]
+config = load_yaml(dino_home + '/dino.yaml')[dino_env]
 config = load_secrets_file(config)
 
 dbtype = config['database']['type']
@@ -56,7 +72,37 @@ if dbtype == 'rdbms':
             dbname, dbuser, dbhost, dbport, dbpass)
         )
         cur = conn.cursor()
-        cur.execute("""select count(distinct user_id) from rooms_users_association_table""")
+
+        # postgres has no loose index scan, so if user_id is the leading column of an index, emulate one with a
+        # recursive cte that jumps to the next larger user_id; only touches O(distinct users) index entries
+        cur.execute(
+            """select 1 from pg_indexes where tablename = %s and indexdef like %s limit 1""",
+            ('rooms_users_association_table', '%(user_id%')
+        )
+        has_user_id_index = cur.fetchone() is not None
+
+        if has_user_id_index:
+            cur.execute("""
+                with recursive t as (
+                    (select user_id from rooms_users_association_table order by user_id limit 1)
+                    union all
+                    select (
+                        select user_id from rooms_users_association_table
+                        where user_id > t.user_id order by user_id limit 1
+                    )
+                    from t where t.user_id is not null
+                )
+                select count(*) from t where user_id is not null""")
+        else:
+            # let postgres use a parallel aggregate (gather of partial hash aggregates) for the full scan
+            cur.execute("""set max_parallel_workers_per_gather = 8""")
+            cur.execute("""set parallel_setup_cost = 0""")
+            cur.execute("""set parallel_tuple_cost = 0""")
+            cur.execute("""
+                select count(*) from (
+                    select user_id from rooms_users_association_table
+                    where user_id is not null group by user_id
+                ) as u""")
         the_count = cur.fetchone()[0]
 
     if dbtype == 'rdbms' and dbdriver.startswith('mysql'):
@@ -64,7 +110,11 @@ if dbtype == 'rdbms':
 
         conn = MySQLdb.connect(passwd=dbpass, db=dbname, user=dbuser, host=dbhost, port=dbport)
         cur = conn.cursor()
-        cur.execute("""select count(distinct user_id) from rooms_users_association_table""")
+        cur.execute("""
+            select count(*) from (
+                select user_id from rooms_users_association_table
+                where user_id is not null group by user_id
+            ) as u""")
         the_count = cur.fetchone()[0]
 
 r_host, r_port = config['cache']['host'].split(':')
@@ -73,5 +123,5 @@ r_db = 0
 if 'db' in config['cache']:
     r_db = config['cache']['db']
 
-r_server = redis.Redis(host=r_host, port=r_port, db=r_db)
+r_server = get_redis(r_host, r_port, r_db)
 r_server.set('users:online:inrooms', the_count)
@@ -1,10 +1,11 @@
 import sys
 import os
 import yaml
-import redis
 import time
 import traceback
 
+from dino.redis_pool import get_redis
+
 
 dino_env = sys.argv[1]
 dino_home = sys.argv[2]
@@ -51,6 +52,15 @@ if dbdriver.startswith('postgres'):
 elif dbdriver.startswith('mysql'):
     import MySQLdb
 
+r_host, r_port = config['cache']['host'].split(':')
+
+r_db = 0
+if 'db' in config['cache']:
+    r_db = config['cache']['db']
+
+# created once, the pooled connection is reused for every count
+r_server = get_redis(r_host, r_port, r_db)
+
 while True:
     the_count = 0
 
@@ -60,22 +70,23 @@ while True:
                 dbname, dbuser, dbhost, dbport, dbpass)
             )
             cur = conn.cursor()
-            cur.execute("""select count(distinct user_id) from rooms_users_association_table""")
+            cur.execute("""
+                select count(*) from (
+                    select user_id from rooms_users_association_table
+                    where user_id is not null group by user_id
+                ) as u""")
             the_count = cur.fetchone()[0]
 
         elif dbdriver.startswith('mysql'):
             conn = MySQLdb.connect(passwd=dbpass, db=dbname, user=dbuser, host=dbhost, port=dbport)
             cur = conn.cursor()
-            cur.execute("""select count(distinct user_id) from rooms_users_association_table""")
+            cur.execute("""
+                select count(*) from (
+                    select user_id from rooms_users_association_table
+                    where user_id is not null group by user_id
+                ) as u""")
             the_count = cur.fetchone()[0]
 
-        r_host, r_port = config['cache']['host'].split(':')
-
-        r_db = 0
-        if 'db' in config['cache']:
-            r_db = config['cache']['db']
-
-        r_server = redis.Redis(host=r_host, port=r_port, db=r_db)
         r_server.set('users:online:inrooms', the_count)
     except Exception as e:
         print('could not count: {}'.format(str(e)))
@@ -9,6 +9,7 @@ from dino.auth import IAuth
 from dino.config import ConfigKeys
 from dino.config import RedisKeys
 from dino.config import SessionKeys
+from dino.redis_pool import get_pool
 
 logger = logging.getLogger()
 
@@ -22,7 +23,7 @@ class AuthRedis(object):
             self.redis_pool = None
             self.redis_instance = FakeStrictRedis(host=host, port=port, db=db)
         else:
-            self.redis_pool = redis.ConnectionPool(host=host, port=port, db=db)
+            self.redis_pool = get_pool(host, port, db)
             self.redis_instance = None
 
         if env is None:
@@ -15,6 +15,7 @@ from dino.config import ConfigKeys
 from dino.config import UserKeys
 from dino.config import RoleKeys
 from dino.cache import ICache
+from dino.redis_pool import get_pool
 from datetime import datetime
 from datetime import timedelta
 import redis
@@ -28,6 +29,10 @@ ONE_MINUTE = 60
 THIRTY_SECONDS = 30
 ONE_HOUR = 60*60
 TEN_SECONDS = 10
+TWO_SECONDS = 2
+
+# cached when redis has no ban info for a user, so not-banned users don't cause a redis lookup on every check
+_NO_BAN_INFO = object()
 
 logger = logging.getLogger(__name__)
 
@@ -73,7 +78,7 @@ class CacheRedis(object):
             self.redis_pool = None
             self.redis_instance = FakeStrictRedis(host=host, port=port, db=db)
         else:
-            self.redis_pool = redis.ConnectionPool(host=host, port=port, db=db)
+            self.redis_pool = get_pool(host, port, db)
             self.redis_instance = None
 
         self.cache = MemoryCache()
@@ -372,14 +377,19 @@ class CacheRedis(object):
     def _get_ban_timestamp(self, key: str, user_id: str) -> (str, str, str):
         cache_key = '%s-%s' % (key, user_id)
         value = self.cache.get(cache_key)
+        if value is _NO_BAN_INFO:
+            return None, None, None
         if value is not None:
             return value.split('|', 2)
 
         ban_info = self.redis.hget(key, user_id)
         if ban_info is None:
+            self.cache.set(cache_key, _NO_BAN_INFO, ttl=TWO_SECONDS)
             return None, None, None
 
+        # keep it in memory as well, but only briefly since bans and unbans on other nodes only update redis
         ban_info = str(ban_info, 'utf-8')
+        self.cache.set(cache_key, ban_info, ttl=TWO_SECONDS)
         return ban_info.split('|', 2)
 
     def get_global_ban_timestamp(self, user_id: str) -> str:
@@ -197,6 +197,17 @@ class RoleKeys(object):
 RoleKeys.all_roles = [getattr(RoleKeys, d) for d in RoleKeys.__dict__ if not d.startswith('_') and not d[0].islower()]
 
 
+class RoleFlags(object):
+    # bit flags for the roles returned by utils.get_roles(); kept here instead of in dino.utils since modules imported
+    # by dino.utils (e.g. dino.validation) need them at import time
+    OWNER = 1
+    OWNER_CHANNEL = 2
+    MODERATOR = 4
+    ADMIN = 8
+    SUPER_USER = 16
+    GLOBAL_MODERATOR = 32
+
+
 class UserKeys(object):
     STATUS_AVAILABLE = '1'
     STATUS_CHAT = '2'
@@ -403,6 +403,29 @@ class IDatabase(Interface):
         :return: a list of strings, roles for that room
         """
 
+    def get_user_roles_in(self, user_id: str, channel_id: str = None, room_id: str = None) -> dict:
+        """
+        get the global roles of a user, together with the roles in only one channel and one room, e.g.:
+
+            {
+                "global": [
+                    "superuser"
+                ],
+                "channel": [
+                    "admin"
+                ],
+                "room": [
+                    "owner",
+                    "moderator"
+                ]
+            }
+
+        :param user_id: the id of the user
+        :param channel_id: the uuid of the channel, or None to skip channel roles
+        :param room_id: the uuid of the room, or None to skip room roles
+        :return: a dict of lists of roles
+        """
+
     def get_reason_for_ban_global(self, user_id: str) -> str:
         """
         get the reason for a global ban, or empty string if no reason found
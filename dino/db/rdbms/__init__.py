@@ -23,6 +23,6 @@ rooms_users_association_table = Table(
         'rooms_users_association_table',
         DeclarativeBase.metadata,
         Column('room_id', Integer, ForeignKey('rooms.id')),
-        Column('user_id', Integer, ForeignKey('users.id')),
+        Column('user_id', Integer, ForeignKey('users.id'), index=True),
         UniqueConstraint('room_id', 'user_id', name='UC_room_id_user_id')
 )
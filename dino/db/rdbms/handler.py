@@ -343,6 +343,14 @@ class DatabaseRdbms(object):
                 _output['room'][r_role.room.uuid] = [a for a in r_role.roles.split(',') if len(a) > 0]
         return _output
 
+    def get_user_roles_in(self, user_id: str, channel_id: str = None, room_id: str = None) -> dict:
+        roles = self.get_user_roles(user_id)
+        return {
+            'global': roles['global'],
+            'channel': roles['channel'].get(channel_id, list()),
+            'room': roles['room'].get(room_id, list())
+        }
+
     def get_user_roles(self, user_id: str) -> dict:
         @with_session
         def _roles(session=None) -> dict:
@@ -62,11 +62,12 @@ class DatabaseRedis(object):
     def __init__(self, env: GNEnvironment, host: str, port: int = 6379, db: int = 0):
         if environ.env.config.get(ConfigKeys.TESTING, False) or host == 'mock':
             from fakeredis import FakeStrictRedis as Redis
+            self.redis = Redis(host=host, port=port, db=db)
         else:
-            from redis import Redis
+            from dino.redis_pool import get_redis
+            self.redis = get_redis(host, port, db)
 
         self.env = env
-        self.redis = Redis(host=host, port=port, db=db)
         self.acl_validator = AclValidator()
         
     def get_all_permanent_rooms(self):
@@ -199,6 +200,26 @@ class DatabaseRedis(object):
             return roles['room'][room_id]
         return list()
 
+    def get_user_roles_in(self, user_id: str, channel_id: str = None, room_id: str = None) -> dict:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hget(RedisKeys.global_roles(), user_id)
+        if channel_id is not None:
+            pipe.hget(RedisKeys.channel_roles(channel_id), user_id)
+        if room_id is not None:
+            pipe.hget(RedisKeys.room_roles(room_id), user_id)
+        values = iter(pipe.execute())
+
+        def _split(value) -> list:
+            if value is None:
+                return list()
+            return [a for a in str(value, 'utf-8').split(',') if len(a) > 0]
+
+        return {
+            'global': _split(next(values)),
+            'channel': _split(next(values)) if channel_id is not None else list(),
+            'room': _split(next(values)) if room_id is not None else list()
+        }
+
     def get_user_roles(self, user_id: str) -> dict:
         output = {
             'global': list(),
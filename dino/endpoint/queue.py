@@ -1,18 +1,19 @@
 import logging
-import traceback
 import time
 import sys
 import os
 
+from collections import deque
 from datetime import datetime
-from uuid import uuid4 as uuid
 from activitystreams.models.activity import Activity
+from eventlet.greenpool import GreenPool
 
 from dino.config import ConfigKeys
 from dino.exceptions import NoSuchUserException
 from dino.environ import GNEnvironment
 from dino import environ
 from dino import utils
+from dino.utils.ids import next_id
 
 __author__ = 'Oscar Eriksson <oscar.eriks@gmail.com>'
 
@@ -23,54 +24,60 @@ if DINO_DEBUG is not None and DINO_DEBUG.lower() in {'1', 'true', 'yes'}:
 else:
     logger.setLevel(logging.INFO)
 
+RECENT_EVENTS_MAX_SIZE = 100
+DELETE_MESSAGES_BATCH_SIZE = 50
+KICK_POOL_SIZE = 16
+NODES_WITH_CLIENTS = {'app', 'wio'}
+
 
 class QueueHandler(object):
     def __init__(self, socketio, env: GNEnvironment):
         self.socketio = socketio
         self.env = env
-        self.recently_delegated_events = list()
+        self.recently_delegated_events = deque(maxlen=RECENT_EVENTS_MAX_SIZE)
         self.recently_delegated_events_set = set()
-        self.recently_handled_events = list()
+        self.recently_handled_events = deque(maxlen=RECENT_EVENTS_MAX_SIZE)
         self.recently_handled_events_set = set()
+        self.kick_pool = GreenPool(size=KICK_POOL_SIZE)
 
-    def user_is_on_this_node(self, activity: Activity) -> bool:
-        if self.env.node not in {'app', 'wio'}:
+    def user_is_on_this_node(self, activity: Activity, user_sids: list = None) -> bool:
+        if self.env.node not in NODES_WITH_CLIENTS:
             return False
 
         room_id = activity.target.id
         namespace = activity.target.url or '/ws'
         user_id = activity.object.id or activity.target.id
-        user_sids = utils.get_sids_for_user_id(user_id)
-        users = list()
+        if user_sids is None:
+            user_sids = utils.get_sids_for_user_id(user_id)
 
         try:
+            rooms_in_namespace = self.socketio.server.manager.rooms.get(namespace)
+            if rooms_in_namespace is None:
+                logger.warning('namespace %s does not exist (maybe this is web/rest node?)', namespace)
+                return False
+
             if room_id is None:
-                logger.debug('checking if we have user %s in namespace %s' % (user_id, namespace))
-                for user_sid in user_sids:
-                    if user_sid in self.socketio.server.manager.rooms[namespace]:
-                        logger.debug('found user %s on this node' % user_id)
-                        return True
-                logger.info('no user %s for namespace [%s] (or user not on this node)' % (user_id, namespace))
+                logger.debug('checking if we have user %s in namespace %s', user_id, namespace)
+                if any(user_sid in rooms_in_namespace for user_sid in user_sids):
+                    logger.debug('found user %s on this node', user_id)
+                    return True
+                logger.info('no user %s for namespace [%s] (or user not on this node)', user_id, namespace)
                 return False
 
-            else:
-                logger.debug('checking if we have room %s in namespace %s' % (room_id, namespace))
-                if room_id in self.socketio.server.manager.rooms[namespace]:
-                    users = self.socketio.server.manager.rooms[namespace][room_id]
-                    logger.debug('found users for room %s: %s' % (room_id, str(users)))
-                else:
-                    logger.warning('no room %s for namespace [%s] (or room is empty/removed)' % (room_id, namespace))
-                return any(user_sid in users for user_sid in user_sids)
+            logger.debug('checking if we have room %s in namespace %s', room_id, namespace)
+            users = rooms_in_namespace.get(room_id)
+            if users is None:
+                logger.warning('no room %s for namespace [%s] (or room is empty/removed)', room_id, namespace)
+                return False
+
+            logger.debug('found users for room %s: %s', room_id, users)
+            return any(user_sid in users for user_sid in user_sids)
 
-        except KeyError as e:
-            logger.warning('namespace %s does not exist (maybe this is web/rest node?): %s' % (namespace, str(e)))
-            return False
         except Exception as e:
-            logger.error('could not get users for namespace "%s" and room "%s": %s' % (namespace, room_id, str(e)))
-            logger.exception(traceback.format_exc())
+            logger.exception('could not get users for namespace "%s" and room "%s": %s', namespace, room_id, e)
             return False
 
-    def create_ban_even_if_not_on_this_node(self, activity: Activity) -> None:
+    def create_ban_even_if_not_on_this_node(self, activity: Activity, published: str = None) -> None:
         """
         since bans can be created through the rest api we need to create the ban even though the user might not be on
         this node, since one reason could be that he's not even connected. So make sure the ban is created first.
@@ -86,9 +93,7 @@ class QueueHandler(object):
             target_type = 'global'
             target_id = ''
 
-        reason = None
-        if hasattr(activity.object, 'content'):
-            reason = activity.object.content
+        reason = getattr(activity.object, 'content', None)
 
         try:
             ban_duration = activity.object.summary
@@ -99,34 +104,32 @@ class QueueHandler(object):
 
             # don't duplicate the ban notification to external queue
             if environ.env.node == 'rest':
-                self.send_ban_event_to_external_queue(activity, target_type)
+                self.send_ban_event_to_external_queue(activity, target_type, published)
 
             if target_type == 'global':
-                logger.info('banning user %s globally for %s' % (banned_id, ban_duration))
+                logger.info('banning user %s globally for %s', banned_id, ban_duration)
                 self.env.db.ban_user_global(banned_id, ban_timestamp, ban_duration, reason, banner_id)
             elif target_type == 'channel':
-                logger.info('banning user %s in channel %s for %s' % (banned_id, target_id, ban_duration))
+                logger.info('banning user %s in channel %s for %s', banned_id, target_id, ban_duration)
                 self.env.db.ban_user_channel(banned_id, ban_timestamp, ban_duration, target_id, reason, banner_id)
             else:
-                logger.info('banning user %s in room %s for %s' % (banned_id, target_id, ban_duration))
+                logger.info('banning user %s in room %s for %s', banned_id, target_id, ban_duration)
                 self.env.db.ban_user_room(banned_id, ban_timestamp, ban_duration, target_id, reason, banner_id)
         except KeyError as ke:
-            logger.error('could not ban: %s' % str(ke))
-            logger.exception(traceback.format_exc())
+            logger.exception('could not ban: %s', ke)
 
     def update_recently_delegated_events(self, activity_id: str) -> None:
+        # the deque drops the oldest id by itself when full, so remove it from the set before appending
+        if len(self.recently_delegated_events) == RECENT_EVENTS_MAX_SIZE:
+            self.recently_delegated_events_set.discard(self.recently_delegated_events[0])
         self.recently_delegated_events.append(activity_id)
         self.recently_delegated_events_set.add(activity_id)
-        if len(self.recently_delegated_events) > 100:
-            self.recently_delegated_events_set.remove(self.recently_delegated_events[0])
-            del self.recently_delegated_events[0]
 
     def update_recently_handled_events(self, activity_id: str) -> None:
+        if len(self.recently_handled_events) == RECENT_EVENTS_MAX_SIZE:
+            self.recently_handled_events_set.discard(self.recently_handled_events[0])
         self.recently_handled_events.append(activity_id)
         self.recently_handled_events_set.add(activity_id)
-        if len(self.recently_handled_events) > 100:
-            self.recently_handled_events_set.remove(self.recently_handled_events[0])
-            del self.recently_handled_events[0]
 
     def handle_send_event(self, data: dict, activity: Activity):
         if not self.user_is_on_this_node(activity):
@@ -146,76 +149,80 @@ class QueueHandler(object):
 
         environ.env.publish(data)
 
-    def handle_local_node_events(self, data: dict, activity: Activity):
+    def handle_local_node_events(self, data: dict, activity: Activity, published: str = None):
         # do this first, since ban might occur even if user is not connected
         if activity.verb == 'ban':
             user_is_on_node = True
 
+            # resolve the sids once, both the node check and the ban itself needs them
+            banned_sids = None
+            if self.env.node in NODES_WITH_CLIENTS:
+                banned_sids = utils.get_sids_for_user_id(activity.object.id or activity.target.id)
+
             # delegate so we don't end up re-reading this event before adding to ignore list
-            if not self.user_is_on_this_node(activity):
+            if not self.user_is_on_this_node(activity, banned_sids):
                 self.send_event_to_other_node(data)
                 user_is_on_node = False
 
-            self.create_ban_even_if_not_on_this_node(activity)
+            self.create_ban_even_if_not_on_this_node(activity, published)
 
             # no need to continue if the user is not on this node; event already delegated
             if not user_is_on_node:
                 return
 
             try:
-                self.handle_ban(activity)
+                self.handle_ban(activity, banned_sids, published)
             except Exception as e:
-                logger.error('could not handle ban: %s' % str(e))
-                logger.exception(traceback.format_exc())
+                logger.exception('could not handle ban: %s', e)
 
         elif activity.verb == 'kick':
             try:
-                self.handle_kick(activity)
+                self.handle_kick(activity, published)
             except Exception as e:
-                logger.error('could not handle kick: %s' % str(e))
-                logger.exception(traceback.format_exc())
+                logger.exception('could not handle kick: %s', e)
 
         elif activity.verb == 'remove':
             try:
                 self.handle_remove(data, activity)
             except Exception as e:
-                logger.error('could not emit remove activity to clients: %s' % str(e))
-                logger.exception(traceback.format_exc())
+                logger.exception('could not emit remove activity to clients: %s', e)
 
     def handle_server_activity(self, data: dict, activity: Activity) -> None:
         try:
             self._handle_server_activity(data, activity)
         except Exception as e:
-            logger.error('could not handle server activity: %s' % str(e))
-            logger.exception(traceback.format_exc())
+            logger.exception('could not handle server activity: %s', e)
 
     def _handle_server_activity(self, data: dict, activity: Activity) -> None:
         if activity.id in self.recently_delegated_events_set:
-            logger.info('ignoring event with id %s since we delegated from this node' % activity.id)
+            logger.info('ignoring event with id %s since we delegated from this node', activity.id)
             return
         if activity.id in self.recently_handled_events_set:
-            logger.info('ignoring event with id %s since we already handled it on this node' % activity.id)
+            logger.info('ignoring event with id %s since we already handled it on this node', activity.id)
             return
         if 'revision' in data:
             if data['revision'] > 3:
-                logger.warning('dropping event {} ({}) since it has revision {}; being sent around too much'.format(
-                    activity.verb, activity.id, data['revision']
-                ))
-                logger.warning('event was : {}'.format(str(data)))
+                logger.warning(
+                    'dropping event %s (%s) since it has revision %s; being sent around too much',
+                    activity.verb, activity.id, data['revision'])
+                logger.warning('event was : %s', data)
             return
 
-        logger.debug('got internally published event with verb %s id %s' % (activity.verb, activity.id))
+        logger.debug('got internally published event with verb %s id %s', activity.verb, activity.id)
         self.update_recently_handled_events(activity.id)
 
         if activity.verb in ['ban', 'kick', 'remove']:
-            self.handle_local_node_events(data, activity)
+            # one timestamp for all events created while handling this activity (a global ban can kick from many rooms)
+            published = datetime.utcnow().strftime(ConfigKeys.DEFAULT_DATE_FORMAT)
+            self.handle_local_node_events(data, activity, published)
         elif activity.verb == 'send':
             self.handle_send_event(data, activity)
         else:
             # otherwise it's external events for possible analysis
             environ.env.publish(data, external=True)
 
-    def kick(self, orig_data: dict, activity: Activity, room_id: str, user_id: str, user_sids: list, namespace: str) -> None:
+    def kick(self, orig_data: dict, activity: Activity, room_id: str, user_id: str, user_sids: list, namespace: str,
+             published: str = None) -> None:
         if room_id is None:
             raise RuntimeError('trying to kick when room is none')
 
@@ -224,37 +231,34 @@ class QueueHandler(object):
             if room_id in self.socketio.server.manager.rooms[namespace]:
                 _users = self.socketio.server.manager.rooms[namespace][room_id]
             else:
-                logger.warning('no room %s for namespace [%s] (or room is empty/removed)' % (room_id, namespace))
+                logger.warning('no room %s for namespace [%s] (or room is empty/removed)', room_id, namespace)
         except Exception as e:
-            logger.error('could not get users for namespace "%s" and room "%s": %s' % (namespace, room_id, str(e)))
-            logger.exception(traceback.format_exc())
+            logger.exception('could not get users for namespace "%s" and room "%s": %s', namespace, room_id, e)
             return
 
-        data = orig_data.copy()
-        data['target'] = {
-            'id': room_id
-        }
+        # kicks for different rooms run concurrently, so each needs its own (shallow) copy with its own target
+        data = dict(orig_data, target={'id': room_id})
 
         self.env.out_of_scope_emit('gn_user_kicked', data, json=True, namespace=namespace, room=room_id, broadcast=True)
-        self.send_kick_event_to_external_queue(activity)
+        self.send_kick_event_to_external_queue(activity, published)
 
         for user_sid in user_sids:
             if user_sid in _users:
-                logger.info('about to kick user %s' % user_sid)
+                logger.info('about to kick user %s', user_sid)
                 try:
                     self.socketio.server.leave_room(user_sid, room_id, '/ws')
                 except Exception as e:
-                    logger.error('could not kick user %s from room %s: %s' % (user_id, room_id, str(e)))
-                    logger.exception(traceback.format_exc())
+                    logger.exception('could not kick user %s from room %s: %s', user_id, room_id, e)
 
                 try:
                     self.env.db.leave_room(user_id, room_id)
                 except Exception as e:
-                    logger.warning('could not remove user from room in db (maybe room is already deleted): %s' % str(e))
+                    logger.warning('could not remove user from room in db (maybe room is already deleted): %s', e)
 
         self.delete_for_user_in_room(user_id, room_id)
 
-    def ban_room(self, data: dict, act: Activity, room_id: str, user_id: str, user_sids: list, namespace: str) -> None:
+    def ban_room(self, data: dict, act: Activity, room_id: str, user_id: str, user_sids: list, namespace: str,
+                 published: str = None) -> None:
         self.env.out_of_scope_emit(
                 'gn_user_banned', data, json=True, namespace=namespace, room=room_id, broadcast=True)
         if act.actor.id != '0':
@@ -262,14 +266,32 @@ class QueueHandler(object):
                      'gn_user_banned', data, json=True, namespace=namespace, room=act.actor.id, broadcast=True)
 
         try:
-            self.kick(data, act, room_id, user_id, user_sids, namespace)
+            self.kick(data, act, room_id, user_id, user_sids, namespace, published)
         except Exception as e:
-            logger.error('could not ban user %s from room %s: %s' % (user_id, room_id, str(e)))
+            logger.error('could not ban user %s from room %s: %s', user_id, room_id, e)
             return
 
         self.delete_for_user_in_room(user_id, room_id)
 
-    def ban_channel(self, data: dict, activity: Activity, rooms_in_channel, channel_id, user_id, user_sids: list, namespace):
+    def kick_from_rooms(self, data: dict, activity: Activity, room_ids, user_id: str, user_sids: list, namespace: str,
+                        published: str = None) -> None:
+        """
+        kick the user from all the given rooms; each kick is io bound (emits, db and storage calls) so they're run
+        concurrently on a bounded pool instead of one room at a time
+        """
+        def _kick(room_id):
+            try:
+                self.kick(data, activity, room_id, user_id, user_sids, namespace, published)
+            except Exception as e:
+                logger.error('could not kick user %s from room %s: %s', user_id, room_id, e)
+                self.env.capture_exception(sys.exc_info())
+
+        # imap() only waits for our own kicks, not for other bans using the same pool
+        for _ in self.kick_pool.imap(_kick, room_ids):
+            pass
+
+    def ban_channel(self, data: dict, activity: Activity, rooms_in_channel, channel_id, user_id, user_sids: list, namespace,
+                    published: str = None):
         try:
             if activity.actor.id != '0':
                 self.env.out_of_scope_emit(
@@ -277,36 +299,33 @@ class QueueHandler(object):
             for room_id in rooms_in_channel:
                 self.env.out_of_scope_emit(
                         'gn_user_banned', data, json=True, namespace=namespace, room=room_id, broadcast=True)
-                self.kick(data, activity, room_id, user_id, user_sids, namespace)
+            self.kick_from_rooms(data, activity, rooms_in_channel, user_id, user_sids, namespace, published)
         except Exception as e:
-            logger.error('could not ban user %s from channel %s: %s' % (user_id, channel_id, str(e)))
-            logger.exception(traceback.format_exc(e))
+            logger.exception('could not ban user %s from channel %s: %s', user_id, channel_id, e)
             self.env.capture_exception(sys.exc_info())
             return
 
         for room_id in rooms_in_channel:
             self.delete_for_user_in_room(user_id, room_id)
 
-    def ban_globally(self, data: dict, act: Activity, rooms: dict, user_id: str, user_sids: list, namespace: str) -> None:
+    def ban_globally(self, data: dict, act: Activity, rooms: dict, user_id: str, user_sids: list, namespace: str,
+                     published: str = None) -> None:
         try:
             message_ids = self.env.storage.get_undeleted_message_ids_for_user(user_id)
-            for message_id in message_ids:
-                self.env.storage.delete_message(message_id, clear_body=False)
+            self.delete_messages(user_id, message_ids)
         except Exception as e:
-            logger.error('could not delete messages for user %s: %s' % (user_id, str(e)))
-            logger.exception(traceback.format_exc(e))
+            logger.exception('could not delete messages for user %s: %s', user_id, e)
             self.env.capture_exception(sys.exc_info())
 
         try:
             if len(rooms) == 0:
-                logger.warning('rooms to ban globally for is empty for user %s' % user_id)
-            for room_id, room_name in rooms.items():
+                logger.warning('rooms to ban globally for is empty for user %s', user_id)
+            for room_id in rooms.keys():
                 self.env.out_of_scope_emit(
                         'gn_user_banned', data, json=True, namespace=namespace, room=room_id, broadcast=True)
-                self.kick(data, act, room_id, user_id, user_sids, namespace)
+            self.kick_from_rooms(data, act, rooms.keys(), user_id, user_sids, namespace, published)
         except Exception as e:
-            logger.error('could not ban user %s globally: %s' % (user_id, str(e)))
-            logger.exception(traceback.format_exc(e))
+            logger.exception('could not ban user %s globally: %s', user_id, e)
             self.env.capture_exception(sys.exc_info())
             return
 
@@ -314,10 +333,9 @@ class QueueHandler(object):
         try:
             before = time.time()
             messages = self.env.storage.get_undeleted_message_ids_for_user_and_room(user_id, room_id)
-            logger.info('about to delete %s messages for user %s (fetching IDs took %.2fs)' % (len(messages), user_id, time.time()-before))
+            logger.info('about to delete %s messages for user %s (fetching IDs took %.2fs)', len(messages), user_id, time.time()-before)
         except Exception as e:
-            logger.error('could not get undeleted messages: %s' % str(e))
-            logger.exception(traceback.format_exc())
+            logger.exception('could not get undeleted messages: %s', e)
             self.env.capture_exception(sys.exc_info())
             return
         self.delete_messages(user_id, messages)
@@ -329,31 +347,52 @@ class QueueHandler(object):
         before = time.time()
         successes, failures = self.try_to_delete_messages(messages)
         elapsed = time.time() - before
-        logger.info('finished deleting %s messages (%s/%s successes) for user %s (deletion took %.2fs)' %
-                    (len(messages), successes, len(messages), user_id, elapsed))
+        logger.info('finished deleting %s messages (%s/%s successes) for user %s (deletion took %.2fs)',
+                    len(messages), successes, len(messages), user_id, elapsed)
 
     def try_to_delete_messages(self, messages) -> (int, int):
         try:
             failures = 0
             successes = 0
-
-            for message_id in messages:
-                try:
-                    self.env.storage.delete_message(message_id, clear_body=False)
-                    successes += 1
-                except Exception as e:
-                    logger.error('could not delete message with id %s because: %s' % (message_id, str(e)))
-                    logger.exception(traceback.format_exc())
-                    self.env.capture_exception(sys.exc_info())
-                    failures += 1
+            messages = list(messages)
+
+            # not all storage backends can delete in bulk, e.g. redis needs the room id of each message
+            delete_batch = getattr(self.env.storage, 'delete_messages', None)
+
+            for i in range(0, len(messages), DELETE_MESSAGES_BATCH_SIZE):
+                batch = messages[i:i+DELETE_MESSAGES_BATCH_SIZE]
+                if delete_batch is not None:
+                    try:
+                        delete_batch(batch, clear_body=False)
+                        successes += len(batch)
+                        continue
+                    except Exception as e:
+                        logger.warning('could not delete batch of %s messages, trying one by one: %s', len(batch), e)
+
+                failed_ids = list()
+                last_error = None
+                for message_id in batch:
+                    try:
+                        self.env.storage.delete_message(message_id, clear_body=False)
+                        successes += 1
+                    except Exception:
+                        failed_ids.append(message_id)
+                        last_error = sys.exc_info()
+
+                # report once per batch instead of once per message
+                if len(failed_ids) > 0:
+                    failures += len(failed_ids)
+                    logger.error(
+                        'could not delete %s of %s messages in batch (%s) because: %s',
+                        len(failed_ids), len(batch), ','.join(failed_ids), last_error[1])
+                    self.env.capture_exception(last_error)
             return successes, failures
         except Exception as e2:
-            logger.error('could not delete messages: %s' % str(e2))
-            logger.exception(traceback.format_exc())
+            logger.exception('could not delete messages: %s', e2)
 
         return 0, len(messages)
 
-    def handle_kick(self, activity: Activity):
+    def handle_kick(self, activity: Activity, published: str = None):
         kicker_id = activity.actor.id
         if kicker_id == '0':
             kicker_name = 'admin'
@@ -362,7 +401,7 @@ class QueueHandler(object):
                 kicker_name = activity.actor.display_name or utils.get_user_name_for(kicker_id)
             except NoSuchUserException:
                 # if kicking from rest api the user might not exist
-                logger.error('no such user when kicking: %s' % kicker_id)
+                logger.error('no such user when kicking: %s', kicker_id)
                 return
 
         kicked_id = activity.object.id
@@ -377,12 +416,10 @@ class QueueHandler(object):
         namespace = activity.target.url
 
         if len(kicked_sids) == 0 or kicked_sids == [None] or kicked_sids[0] == '':
-            logger.warning('no sid(s) found for user id %s' % kicked_id)
+            logger.warning('no sid(s) found for user id %s', kicked_id)
             return
 
-        reason = None
-        if hasattr(activity.object, 'content'):
-            reason = activity.object.content
+        reason = getattr(activity.object, 'content', None)
 
         activity_json = utils.activity_for_user_kicked(
                 kicker_id, kicker_name, kicked_id, kicked_name, room_id, room_name, reason)
@@ -390,16 +427,15 @@ class QueueHandler(object):
         try:
             # user just got banned globally, kick from all rooms
             if room_id is None or room_id == '':
-                room_keys = self.env.db.rooms_for_user(kicked_id).copy().keys()
-                for room_key in room_keys:
-                    self.kick(activity_json, activity, room_key, kicked_id, kicked_sids, namespace)
+                for room_key in self.env.db.rooms_for_user(kicked_id):
+                    self.kick(activity_json, activity, room_key, kicked_id, kicked_sids, namespace, published)
             else:
-                self.kick(activity_json, activity, room_id, kicked_id, kicked_sids, namespace)
+                self.kick(activity_json, activity, room_id, kicked_id, kicked_sids, namespace, published)
         except KeyError as e:
-            logger.error('could not kick user %s: %s' % (kicked_id, str(e)))
+            logger.error('could not kick user %s: %s', kicked_id, e)
             self.env.capture_exception(sys.exc_info())
 
-    def handle_ban(self, activity: Activity):
+    def handle_ban(self, activity: Activity, banned_sids: list = None, published: str = None):
         banner_id = activity.actor.id
         if banner_id == '0' or banner_id is None:
             banner_id = '0'
@@ -409,17 +445,18 @@ class QueueHandler(object):
                 banner_name = utils.get_user_name_for(banner_id)
             except NoSuchUserException:
                 # if banning from rest api the user might not exist
-                logger.error('no such user when banning: %s' % banner_id)
+                logger.error('no such user when banning: %s', banner_id)
                 return
 
         banned_id = activity.object.id
         if not utils.is_valid_id(banned_id):
-            logger.warning('got invalid id on ban activity: {}'.format(str(activity.id)))
+            logger.warning('got invalid id on ban activity: %s', activity.id)
             # TODO: sentry
             return
 
         banned_name = utils.get_user_name_for(banned_id)
-        banned_sids = utils.get_sids_for_user_id(banned_id)
+        if banned_sids is None:
+            banned_sids = utils.get_sids_for_user_id(banned_id)
         namespace = activity.target.url or '/ws'
         target_type = activity.target.object_type
 
@@ -434,107 +471,116 @@ class QueueHandler(object):
             target_name = ''
 
         if len(banned_sids) == 0 or banned_sids == [None] or banned_sids[0] == '':
-            logger.warning('no sid(s) found for user id %s' % banned_id)
+            logger.warning('no sid(s) found for user id %s', banned_id)
             return
 
-        reason = None
-        if hasattr(activity.object, 'content'):
-            reason = activity.object.content
+        reason = getattr(activity.object, 'content', None)
 
         activity_json = utils.activity_for_user_banned(
                 banner_id, banner_name, banned_id, banned_name, target_id, target_name, reason)
 
         try:
-            ban_activity = self.get_ban_activity(activity, target_type)
+            ban_activity = self.get_ban_activity(activity, target_type, published)
             self.env.out_of_scope_emit(
                     'gn_banned', ban_activity, json=True, namespace=namespace, room=banned_id)
 
             if target_id is None or target_id == '':
                 rooms_for_user = self.env.db.rooms_for_user(banned_id)
-                logger.info('user %s is in these rooms (will ban from all): %s' % (banned_id, str(rooms_for_user)))
-                self.ban_globally(activity_json, activity, rooms_for_user, banned_id, banned_sids, namespace)
+                logger.info('user %s is in %s rooms (will ban from all)', banned_id, len(rooms_for_user))
+                logger.debug('rooms for user %s: %s', banned_id, rooms_for_user)
+                self.ban_globally(activity_json, activity, rooms_for_user, banned_id, banned_sids, namespace, published)
                 self.env.db.set_user_offline(banned_id)
                 disconnect_activity = utils.activity_for_disconnect(banned_id, banned_name)
                 self.env.publish(disconnect_activity, external=True)
 
             elif target_type == 'channel':
                 rooms_in_channel = self.env.db.rooms_for_channel(target_id)
-                self.ban_channel(activity_json, activity, rooms_in_channel, target_id, banned_id, banned_sids, namespace)
+                self.ban_channel(
+                    activity_json, activity, rooms_in_channel, target_id, banned_id, banned_sids, namespace, published)
             else:
-                self.ban_room(activity_json, activity, target_id, banned_id, banned_sids, namespace)
+                self.ban_room(activity_json, activity, target_id, banned_id, banned_sids, namespace, published)
 
         except KeyError as ke:
-            logger.error('could not ban: %s' % str(ke))
-            logger.exception(traceback.format_exc())
+            logger.exception('could not ban: %s', ke)
             self.env.capture_exception(sys.exc_info())
 
-    def get_ban_activity(self, activity: Activity, target_type: str) -> dict:
-        ban_activity = {
+    def get_ban_activity(self, activity: Activity, target_type: str, published: str = None) -> dict:
+        if published is None:
+            published = datetime.utcnow().strftime(ConfigKeys.DEFAULT_DATE_FORMAT)
+
+        actor, obj, target = activity.actor, activity.object, activity.target
+
+        ban_object = {
+            'id': obj.id,
+            'displayName': obj.display_name,
+            'summary': obj.summary,
+            'updated': obj.updated
+        }
+
+        reason = obj.content
+        if reason is not None and len(reason.strip()) > 0:
+            ban_object['content'] = reason
+
+        # when banning globally, not target room is specified
+        if target is None:
+            ban_target = {'objectType': target_type}
+        else:
+            ban_target = {
+                'id': target.id,
+                'displayName': target.display_name,
+                'objectType': target.object_type
+            }
+
+        return {
             'actor': {
-                'id': activity.actor.id,
-                'displayName': activity.actor.display_name
+                'id': actor.id,
+                'displayName': actor.display_name
             },
             'verb': 'ban',
-            'object': {
-                'id': activity.object.id,
-                'displayName': activity.object.display_name,
-                'summary': activity.object.summary,
-                'updated': activity.object.updated
-            },
-            'id': str(uuid()),
-            'published': datetime.utcnow().strftime(ConfigKeys.DEFAULT_DATE_FORMAT)
+            'object': ban_object,
+            'target': ban_target,
+            'id': next_id(),
+            'published': published
         }
 
-        reason = None
-        if activity.object is not None:
-            reason = activity.object.content
-        if reason is not None and len(reason.strip()) > 0:
-            ban_activity['object']['content'] = reason
+    def send_ban_event_to_external_queue(self, activity: Activity, target_type: str, published: str = None) -> None:
+        ban_activity = self.get_ban_activity(activity, target_type, published)
+        logger.debug('publishing ban event to external queue: %s', ban_activity)
+        self.env.publish(ban_activity, external=True)
 
-        ban_activity['target'] = {
-            'objectType': target_type
-        }
+    def send_kick_event_to_external_queue(self, activity: Activity, published: str = None) -> None:
+        if published is None:
+            published = datetime.utcnow().strftime(ConfigKeys.DEFAULT_DATE_FORMAT)
 
-        # when banning globally, not target room is specified
-        if activity.target is not None:
-            ban_activity['target']['id'] = activity.target.id
-            ban_activity['target']['displayName'] = activity.target.display_name
-            ban_activity['target']['objectType'] = activity.target.object_type
+        actor, obj, target = activity.actor, activity.object, activity.target
 
-        return ban_activity
+        kick_object = {
+            'id': obj.id,
+            'displayName': obj.display_name
+        }
 
-    def send_ban_event_to_external_queue(self, activity: Activity, target_type: str) -> None:
-        ban_activity = self.get_ban_activity(activity, target_type)
-        logger.debug('publishing ban event to external queue: %s' % ban_activity)
-        self.env.publish(ban_activity, external=True)
+        reason = getattr(obj, 'content', None)
+        if reason is not None and len(reason.strip()) > 0:
+            kick_object['content'] = reason
 
-    def send_kick_event_to_external_queue(self, activity: Activity) -> None:
         kick_activity = {
             'actor': {
-                'id': activity.actor.id,
-                'displayName': activity.actor.display_name
+                'id': actor.id,
+                'displayName': actor.display_name
             },
             'verb': 'kick',
-            'object': {
-                'id': activity.object.id,
-                'displayName': activity.object.display_name
-            },
-            'id': str(uuid()),
-            'published': datetime.utcnow().strftime(ConfigKeys.DEFAULT_DATE_FORMAT)
+            'object': kick_object,
+            'id': next_id(),
+            'published': published
         }
 
-        reason = None
-        if hasattr(activity, 'object') and hasattr(activity.object, 'content'):
-            reason = activity.object.content
-        if reason is not None and len(reason.strip()) > 0:
-            kick_activity['object']['content'] = reason
-
-        if activity.target is not None:
-            kick_activity['target'] = dict()
-            kick_activity['target']['id'] = activity.target.id
-            kick_activity['target']['displayName'] = activity.target.display_name
+        if target is not None:
+            kick_activity['target'] = {
+                'id': target.id,
+                'displayName': target.display_name
+            }
 
-        logger.debug('publishing kick event to external queue: %s' % kick_activity)
+        logger.debug('publishing kick event to external queue: %s', kick_activity)
         self.env.publish(kick_activity, external=True)
 
     def handle_remove(self, data: dict, activity: Activity):
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import redis
+
+__author__ = 'Oscar Eriksson <oscar.eriks@gmail.com>'
+
+DEFAULT_MAX_CONNECTIONS = 100
+
+_pools = dict()
+
+
+def get_pool(host: str, port: int = 6379, db: int = 0) -> redis.ConnectionPool:
+    """
+    get the shared connection pool for this host/port/db, creating it on first use; all redis clients in the same
+    process should use this so that connections (and the connect/select handshake) are reused, and the number of
+    open sockets stays bounded even during bursts of activity
+    """
+    # the config handling in dino.environ passes None when no port is part of the host string
+    port = 6379 if port is None else int(port)
+    db = 0 if db is None else int(db)
+
+    key = (host, port, db)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = redis.BlockingConnectionPool(
+            host=host, port=port, db=db, max_connections=DEFAULT_MAX_CONNECTIONS)
+        _pools[key] = pool
+    return pool
+
+
+def get_redis(host: str, port: int = 6379, db: int = 0) -> redis.Redis:
+    return redis.Redis(connection_pool=get_pool(host, port, db))
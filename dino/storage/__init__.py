@@ -101,3 +101,13 @@ class IStorage(Interface):
         :param message_id: the uuid of the message to delete
         :return: nothing
         """
+
+    def delete_messages(self, message_ids: list, clear_body: bool=True) -> None:
+        """
+        delete several messages in one batch instead of one query per message; optional, not implemented by the redis
+        storage since it needs the room id of each message, so callers should check for it first
+
+        :param message_ids: the uuids of the messages to delete
+        :param clear_body: if the message bodies should be removed as well
+        :return: nothing
+        """
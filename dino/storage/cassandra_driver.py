@@ -22,6 +22,8 @@ from zope.interface import implementer
 from cassandra.cluster import ResultSet
 from cassandra.cluster import Session
 from cassandra.query import ValueSequence
+from cassandra.query import BatchStatement
+from cassandra.query import BatchType
 
 from dino.storage.cassandra_interface import IDriver
 from dino.config import ConfigKeys
@@ -444,6 +446,30 @@ class Driver(object):
     def msg_delete(self, message_id: str, clear_body=True) -> None:
         self._msg_delete(message_id, deleted=True, clear_body=clear_body)
 
+    def msgs_delete(self, message_ids: list, clear_body=True) -> None:
+        """
+        Same as msg_delete() but for several messages at once; the messages_by_id view already contains the complete
+        rows, so one select for all ids and one (unlogged) batch of updates is enough, instead of three queries per
+        message.
+
+        :param message_ids: the uuids of the messages to 'delete' (will only flag as deleted, will not remove)
+        """
+        if message_ids is None or len(message_ids) == 0:
+            return
+
+        rows = self.msgs_select_all_in(set(message_ids))
+        if rows is None or len(rows.current_rows) == 0:
+            return
+
+        batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+        for row in rows.current_rows:
+            body = '' if clear_body else row.body
+            batch.add(
+                self.statements[StatementKeys.msg_update],
+                (body, True, row.target_id, row.from_user_id, row.sent_time, row.time_stamp))
+
+        self.session.execute(batch)
+
     def _msg_delete(self, message_id: str, deleted: bool, clear_body: bool=True) -> None:
         """
         We're doing three queries here, one to get primary index of messages table from message_id, then getting the
@@ -48,6 +48,15 @@ class IDriver(Interface):
         :return: nothing
         """
 
+    def msgs_delete(self, message_ids: list, clear_body: bool=True) -> None:
+        """
+        flag several messages as deleted using a single batch
+
+        :param message_ids: uuids of the messages to delete
+        :param clear_body: if the message bodies should be removed as well
+        :return: nothing
+        """
+
     def msgs_select_non_deleted_for_user(self, from_user_id: str):
         """
         Get all un-deleted message ids send from a certain user. User by rest api to delete everything from a certain
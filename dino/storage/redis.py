@@ -26,10 +26,10 @@ class StorageRedis(object):
 
         if self.env.config.get(ConfigKeys.TESTING, False) or host == 'mock':
             from fakeredis import FakeRedis as Redis
+            self.redis = Redis(host=host, port=port, db=db)
         else:
-            from redis import Redis
-
-        self.redis = Redis(host=host, port=port, db=db)
+            from dino.redis_pool import get_redis
+            self.redis = get_redis(host, port, db)
 
     def store_message(self, activity: Activity, deleted=False) -> None:
         target_id = activity.target.id
@@ -58,7 +58,7 @@ class StorageRedis(object):
     def get_all_message_ids_for_user(self, user_id: str):
         return list()
 
-    def delete_message(self, message_id: str, room_id: str=None):
+    def delete_message(self, message_id: str, room_id: str=None, clear_body: bool=True):
         if room_id is None:
             raise RuntimeError('redis storage needs room_id parameter to delete message')
 
@@ -28,6 +28,8 @@ from dino.config import UserKeys
 from dino.config import ApiActions
 from dino.config import ApiTargets
 from dino.config import SessionKeys
+from dino.config import RoleKeys
+from dino.config import RoleFlags
 from dino.utils.blacklist import BlackListChecker
 from dino.utils.activity_helper import ActivityBuilder
 from datetime import timedelta
@@ -52,6 +54,13 @@ else:
 
 ADMIN_B64 = 'QWRtaW4='
 
+ROLE_OWNER = RoleFlags.OWNER
+ROLE_OWNER_CHANNEL = RoleFlags.OWNER_CHANNEL
+ROLE_MODERATOR = RoleFlags.MODERATOR
+ROLE_ADMIN = RoleFlags.ADMIN
+ROLE_SUPER_USER = RoleFlags.SUPER_USER
+ROLE_GLOBAL_MODERATOR = RoleFlags.GLOBAL_MODERATOR
+
 
 class suppress_stdout_stderr(object):
     """
@@ -1293,6 +1302,37 @@ def get_user_roles(user_id: str):
     return environ.env.db.get_user_roles(user_id)
 
 
+def get_roles(user_id: str, channel_id: str = None, room_id: str = None) -> int:
+    """
+    get the roles a user has globally and in the given channel and room as a bitset of the ROLE_* flags, using a
+    single roles lookup instead of one is_owner()/is_admin()/etc. call per role
+
+    :param user_id: uuid of the user
+    :param channel_id: uuid of the channel, or None to skip channel roles
+    :param room_id: uuid of the room, or None to skip room roles
+    :return: the ROLE_* flags or'ed together
+    """
+    user_roles = environ.env.db.get_user_roles_in(user_id, channel_id, room_id)
+    global_roles = user_roles['global']
+    channel_roles = user_roles['channel']
+    room_roles = user_roles['room']
+
+    roles = 0
+    if RoleKeys.OWNER in room_roles:
+        roles |= ROLE_OWNER
+    if RoleKeys.MODERATOR in room_roles:
+        roles |= ROLE_MODERATOR
+    if RoleKeys.OWNER in channel_roles:
+        roles |= ROLE_OWNER_CHANNEL
+    if RoleKeys.ADMIN in channel_roles:
+        roles |= ROLE_ADMIN
+    if RoleKeys.SUPER_USER in global_roles:
+        roles |= ROLE_SUPER_USER
+    if RoleKeys.GLOBAL_MODERATOR in global_roles:
+        roles |= ROLE_GLOBAL_MODERATOR
+    return roles
+
+
 def rooms_for_user(user_id: str):
     rooms = environ.env.db.rooms_for_user(user_id)
     if rooms is None or len(rooms) == 0:
@@ -114,10 +114,12 @@ def count_connections(connect_type=None):
 
 def pre_process(validation_name, should_validate_request=True):
     def factory(view_func):
+        handler = validation.RequestValidator.HANDLERS.get(validation_name)
+
         @wraps(view_func)
         def decorator(*a, **k):
             def _pre_process(*args, **kwargs):
-                if not hasattr(validation.request, validation_name):
+                if handler is None:
                     raise RuntimeError('no such attribute on validation.request: %s' % validation_name)
 
                 try:
@@ -152,7 +154,7 @@ def pre_process(validation_name, should_validate_request=True):
                             logger.error('[%s] validation failed, error message: %s' % (validation_name, str(error_msg)))
                             return ErrorCodes.VALIDATION_ERROR, error_msg
 
-                    is_valid, status_code, message = getattr(validation.request, validation_name)(activity)
+                    is_valid, status_code, message = handler(validation.request, activity)
                     if is_valid:
                         all_ok = True
                         if validation_name in environ.env.event_validator_map:
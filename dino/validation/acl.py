@@ -13,6 +13,9 @@
 # limitations under the License.
 
 import logging
+import sys
+
+from functools import lru_cache
 
 from activitystreams.models.activity import Activity
 
@@ -222,22 +225,95 @@ class AclIsSuperUserValidator(BaseAclValidator):
         return False, 'not super user'
 
 
+_CLAUSE_SIMPLE = 0
+_CLAUSE_NESTED = 1
+_CLAUSE_ERROR = 2
+
+
+@lru_cache(maxsize=4096)
+def _parse_custom_acl(clause: str) -> tuple:
+    """
+    split a "custom" acl value into its or/and clauses; the same few acl values are checked on every join, so the
+    result is cached and only the evaluation against the user's session is done each time
+
+    :param clause: the value of the "custom" acl, e.g. "gender=m|age=:35,gender=!m"
+    :return: a tuple of (or_clauses, parsed_or_clauses), where each parsed or clause is a tuple of (kind, value) and
+    clauses; kind is one of _CLAUSE_SIMPLE (value is a tuple of (clause, acl_type, acl_value, value_is_negated), e.g.
+    ("age=!:35", "age", ":35", True)), _CLAUSE_NESTED (value is another parsed clause) or _CLAUSE_ERROR (value is the
+    error message, raised only if the clause is reached during evaluation)
+    """
+    return _split_custom_acl(dict(), clause)
+
+
+def _split_custom_acl(groups: dict, clause: str) -> tuple:
+    # groups stores the parenthesis clauses so we can split the and/or tokens without affecting the parenthesises;
+    # since this is recursive we have to pass the dict throughout the recursion
+    while '(' in clause:
+        pos = len(groups)
+        start = clause.index('(')+1
+        end = clause.index(')')
+        groups[pos] = clause[start:end]
+        clause = clause[:start-1] + '@%s@' % pos + clause[end+1:]
+
+    or_clauses = [clause]
+    if '|' in clause:
+        or_clauses = clause.split('|')
+
+    parsed_or_clauses = list()
+    for or_clause in or_clauses:
+        and_clauses = [or_clause]
+        if ',' in or_clause:
+            and_clauses = or_clause.split(',')
+
+        parsed_and_clauses = list()
+        for and_clause in and_clauses:
+            if '@' in and_clause:
+                if and_clause[0] != '@' or and_clause[-1] != '@' or and_clause.count('@') != 2:
+                    parsed_and_clauses.append((_CLAUSE_ERROR, 'mismatched at-signs in clause: %s' % and_clause))
+                    break
+                and_clause = groups[int(and_clause[1:len(and_clause)-1])]
+
+            if len([c for c in and_clause if c in '|,']) > 0:
+                parsed_and_clauses.append((_CLAUSE_NESTED, _split_custom_acl(groups, and_clause)))
+            else:
+                parsed_and_clauses.append(_split_simple_clause(and_clause))
+        parsed_or_clauses.append(tuple(parsed_and_clauses))
+
+    return tuple(or_clauses), tuple(parsed_or_clauses)
+
+
+def _split_simple_clause(clause: str) -> tuple:
+    if '=' not in clause:
+        return _CLAUSE_ERROR, 'no equal sign in clause: %s' % clause
+
+    if len(clause.split('=')) != 2:
+        return _CLAUSE_ERROR, 'equal sign mismatch in clause: %s' % clause
+
+    acl_type, acl_value = clause.split('=')
+    if len(acl_value) == 0:
+        return _CLAUSE_ERROR, 'no value in clause: %s' % clause
+
+    value_is_negated = False
+    if acl_value[0] == '!':
+        acl_value = acl_value[1:]
+        value_is_negated = True
+
+    # acl_type is used as the key for the session and validator lookups on every evaluation of this clause
+    return _CLAUSE_SIMPLE, (clause, sys.intern(acl_type), acl_value, value_is_negated)
+
+
 class AclPatternValidator(BaseAclValidator):
+    # same as the pattern '^[0-9a-z!\|,\(\):=_]*$', but a subset check is a single pass without the regex engine
+    ALLOWED_CHARS = frozenset('0123456789abcdefghijklmnopqrstuvwxyz!|,():=_')
+
     def __init__(self):
         self.acl_type = 'custom'
-        pattern = '^[0-9a-z!\|,\(\):=_]*$'
-
-        try:
-            import re
-            self.pattern = re.compile(pattern)
-        except Exception:
-            raise ValidationException('invalid pattern: %s' % str(pattern))
 
     def validate_new_acl(self, values: str):
         if values is None or len(values.strip()) == 0:
             raise ValidationException('blank pattern')
 
-        if self.pattern.match(values) is None:
+        if not AclPatternValidator.ALLOWED_CHARS.issuperset(values):
             raise ValidationException('pattern did not match new value: %s' % values)
 
         if '(' in values or ')' in values:
@@ -255,17 +331,10 @@ class AclPatternValidator(BaseAclValidator):
                 if abs(opened - closed) > 1 or closed > opened:
                     raise ValidationException('nest parenthesis not allowed in pattern: %s' % values)
 
-        groups = dict()
-        self._split_and_test_clause(groups, values, is_validating_a_user=False)
-
-    def _test_a_clause(self, clause, is_validating_a_user: bool, activity: Activity=None, env=None):
-        if '=' not in clause:
-            raise ValidationException('no equal sign in clause: %s' % clause)
+        self._split_and_test_clause(values, is_validating_a_user=False)
 
-        if len(clause.split('=')) != 2:
-            raise ValidationException('equal sign mismatch in clause: %s' % clause)
-
-        acl_type, acl_value = clause.split('=')
+    def _test_a_clause(self, simple_clause: tuple, is_validating_a_user: bool, activity: Activity=None, env=None):
+        clause, acl_type, acl_value, value_is_negated = simple_clause
         all_acls = environ.env.config.get(ConfigKeys.ACL)
         all_validators = all_acls['validation']
         if acl_type not in all_validators:
@@ -276,11 +345,6 @@ class AclPatternValidator(BaseAclValidator):
             raise ValidationException(
                     'nested custom acls not allowed in clause: %s' % clause)
 
-        value_is_negated = False
-        if acl_value[0] == '!':
-            acl_value = acl_value[1:]
-            value_is_negated = True
-
         validator_func = all_validators[acl_type]['value']
         if not isinstance(validator_func, BaseAclValidator):
             raise ValidationException(
@@ -299,7 +363,7 @@ class AclPatternValidator(BaseAclValidator):
             validator_func.validate_new_acl(acl_value)
             return True, None
 
-    def _split_and_test_clause(self, groups, clause, is_validating_a_user: bool=False, activity: Activity=None, env=None):
+    def _split_and_test_clause(self, clause, is_validating_a_user: bool=False, activity: Activity=None, env=None):
         """
         The default value for is_validating_a_user is False, meaning we're validating a new acl rule someone set in the
         admin web interface. In this case the activity and env variables are not used. On the other hand, if
@@ -308,41 +372,27 @@ class AclPatternValidator(BaseAclValidator):
         info set on the environment for this user, e.g. age, gender or whatever it could be in the current 7
         implementation.
 
-        :param groups: the first time this method is called this dict has to be empty; it is used to store parenthesis
-        clauses, so we can split the and/or tokens without affecting the parenthesises; since this method is recursive
-        we have to pass this dict throughout the recursion
+        The clause is only split into its and/or parts the first time it's seen, see _parse_custom_acl().
+
         :param clause: the value of the "custom" acl, e.g. "gender=m|age=:35,gender=!m"
         :param is_validating_a_user: true means validate a user api action, false means validate a new custom acl rule
         :param activity: the activity the user supplied (if is_validating_a_user is True, None otherwise)
         :param env: the current environ.env (if is_validating_a_user is True, None otherwise)
         :return: nothing
         """
-        while '(' in clause:
-            pos = len(groups)
-            start = clause.index('(')+1
-            end = clause.index(')')
-            groups[pos] = clause[start:end]
-            clause = clause[:start-1] + '@%s@' % pos + clause[end+1:]
-
-        or_clauses = [clause]
-        if '|' in clause:
-            or_clauses = clause.split('|')
-
-        for or_clause in or_clauses:
-            and_clauses = [or_clause]
-            if ',' in or_clause:
-                and_clauses = or_clause.split(',')
+        self._test_parsed_clause(_parse_custom_acl(clause), is_validating_a_user, activity, env)
 
-            all_and_ok = True
-            for and_clause in and_clauses:
-                if '@' in and_clause:
-                    if and_clause[0] != '@' or and_clause[-1] != '@' or and_clause.count('@') != 2:
-                        raise ValidationException('mismatched at-signs in clause: %s' % and_clause)
-                    and_clause = groups[int(and_clause[1:len(and_clause)-1])]
+    def _test_parsed_clause(self, parsed, is_validating_a_user: bool, activity: Activity=None, env=None):
+        or_clauses, parsed_or_clauses = parsed
 
+        for and_clauses in parsed_or_clauses:
+            all_and_ok = True
+            for kind, and_clause in and_clauses:
                 try:
-                    if len([c for c in and_clause if c in '|,']) > 0:
-                        self._split_and_test_clause(groups, and_clause, is_validating_a_user, activity, env)
+                    if kind == _CLAUSE_ERROR:
+                        raise ValidationException(and_clause)
+                    if kind == _CLAUSE_NESTED:
+                        self._test_parsed_clause(and_clause, is_validating_a_user, activity, env)
                     else:
                         is_valid, error_msg = self._test_a_clause(and_clause, is_validating_a_user, activity, env)
                         if not is_valid:
@@ -380,9 +430,7 @@ class AclPatternValidator(BaseAclValidator):
         acl_value = args[3]
 
         try:
-            #  _split_and_test_clause() is called recursively, but we need to retain the extracted parenthesis "groups"
-            groups = dict()
-            self._split_and_test_clause(groups, acl_value, is_validating_a_user=True, activity=activity, env=env)
+            self._split_and_test_clause(acl_value, is_validating_a_user=True, activity=activity, env=env)
         except ValidationException as e:
             logger.error(e.msg)
             return False, e.msg
@@ -473,11 +521,18 @@ class AclSameRoomValidator(BaseAclValidator):
         return False, 'rooms are not the same'
 
 
+@lru_cache(maxsize=1024)
+def _csv_values(csv: str) -> frozenset:
+    return frozenset(csv.split(','))
+
+
 class AclStrInCsvValidator(BaseAclValidator):
     def __init__(self, csv=None):
         self.valid_csvs = None
+        self.valid_values = None
         if csv is not None:
             self.valid_csvs = csv.split(',')
+            self.valid_values = frozenset(self.valid_csvs)
 
     def validate_new_acl(self, values: str):
         # all new values accepted, e.g. for city or country
@@ -489,7 +544,7 @@ class AclStrInCsvValidator(BaseAclValidator):
 
         new_values = values.split(',')
         for new_value in new_values:
-            if new_value in self.valid_csvs:
+            if new_value in self.valid_values:
                 continue
 
             raise ValidationException(
@@ -508,21 +563,23 @@ class AclStrInCsvValidator(BaseAclValidator):
 
         if acl_values.strip() == '':
             return True, None
-        acl_values = acl_values.split(',')
 
         session_value = env.session.get(acl_type)
         if session_value is None:
             logger.warning('no session value for acl "%s"' % acl_type)
             return False, 'no session value for acl"%s"' % acl_type
 
+        # the same few acl values are checked on every join, so only split them once
+        allowed_values = _csv_values(acl_values)
+
         if value_is_negated:
-            if session_value in acl_values:
+            if session_value in allowed_values:
                 return False, 'session value %s is in non-allowed (ACL negated) values [%s]' % \
-                       (session_value, ','.join(acl_values))
+                       (session_value, acl_values)
             return True, None
 
-        if session_value not in acl_values:
-            return False, 'session value %s not in allowed values [%s]' % (session_value, ','.join(acl_values))
+        if session_value not in allowed_values:
+            return False, 'session value %s not in allowed values [%s]' % (session_value, acl_values)
         return True, None
 
 
@@ -5,8 +5,10 @@ from activitystreams.models.actor import Actor
 from activitystreams.models.target import Target
 
 import logging
-import traceback
+import os
+import time
 
+from functools import wraps
 from uuid import UUID
 
 from dino import utils
@@ -15,6 +17,7 @@ from dino.config import ApiActions
 from dino.config import ApiTargets
 from dino.config import ConfigKeys
 from dino.config import ErrorCodes as ECodes
+from dino.config import RoleFlags
 from dino.validation.base import BaseValidator
 from dino.exceptions import NoSuchRoomException
 from dino.exceptions import NoSuchUserException
@@ -29,28 +32,55 @@ __author__ = 'Oscar Eriksson <oscar.eriks@gmail.com>'
 
 logger = logging.getLogger(__name__)
 
+DINO_PROFILE = os.environ.get('DINO_PROFILE')
+
+_VALID_STATUSES = frozenset(('online', 'offline', 'invisible'))
+
+_GLOBAL_ROLES = RoleFlags.SUPER_USER | RoleFlags.GLOBAL_MODERATOR
+
+
+def _blank(s: str) -> bool:
+    return not s or not s.strip()
+
+
+def _timed(name: str, validator_func):
+    """
+    report the time spent in a validator as 'validation.<name>' to the stats backend; the request decorator only
+    times the whole event, this shows how much of that was validation
+
+    :param name: name of the validator method, e.g. on_message
+    :param validator_func: the unbound validator method
+    :return: the wrapped method
+    """
+    @wraps(validator_func)
+    def timed(self, activity: Activity):
+        before = time.time()
+        try:
+            return validator_func(self, activity)
+        finally:
+            environ.env.stats.timing('validation.' + name, (time.time()-before)*1000)
+    return timed
+
 
 class RequestValidator(BaseValidator):
     def on_msg_status(self, _: Activity) -> (bool, int, str):
         return True, None, None
 
     def on_message(self, activity: Activity) -> (bool, int, str):
-        room_id = activity.target.id
-        user_id = activity.actor.id
-        object_type = activity.target.object_type
-        message = activity.object.content
-
-        from_room_id = None
-        if hasattr(activity.actor, 'url'):
-            from_room_id = activity.actor.url
-
-        if message is None or len(message.strip()) == 0:
+        actor, target, obj = activity.actor, activity.target, activity.object
+        room_id = target.id
+        user_id = actor.id
+        object_type = target.object_type
+        message = obj.content
+        from_room_id = getattr(actor, 'url', None)
+
+        if _blank(message):
             return False, ECodes.EMPTY_MESSAGE, 'empty message body'
 
         if not utils.is_base64(message):
             return False, ECodes.NOT_BASE64, 'invalid message content, not base64 encoded'
 
-        if room_id is None or room_id == '':
+        if _blank(room_id):
             return False, ECodes.MISSING_TARGET_ID, 'no room id specified when sending message'
 
         if object_type not in ['room', 'private']:
@@ -58,31 +88,31 @@ class RequestValidator(BaseValidator):
                    'invalid object_type "%s", must be one of [room, private]' % object_type
 
         if object_type == 'room':
-            channel_id = None
-            if hasattr(activity, 'object') and hasattr(activity.object, 'url'):
-                channel_id = activity.object.url
-            if channel_id is None or len(channel_id.strip()) == 0:
+            channel_id = getattr(obj, 'url', None)
+            if _blank(channel_id):
                 channel_id = utils.get_channel_for_room(room_id)
 
-            if channel_id is None or channel_id == '':
+            if _blank(channel_id):
                 return False, ECodes.MISSING_OBJECT_URL, 'no channel id specified when sending message'
 
-            activity.object.url = channel_id
-            activity.object.display_name = utils.get_channel_name(channel_id)
+            # only an origin room that differs from the target needs its own lookups
+            is_cross_room = from_room_id is not None and from_room_id != room_id
 
             if not utils.channel_exists(channel_id):
                 return False, ECodes.NO_SUCH_CHANNEL, 'channel %s does not exists' % channel_id
 
+            obj.url = channel_id
+            obj.display_name = utils.get_channel_name(channel_id)
+
             if not utils.room_exists(channel_id, room_id):
                 return False, ECodes.NO_SUCH_ROOM, 'target room %s does not exist' % room_id
 
-            if from_room_id is not None:
-                if from_room_id != room_id and not utils.room_exists(channel_id, from_room_id):
-                    return False, ECodes.NO_SUCH_ROOM, 'origin room %s does not exist' % from_room_id
+            if is_cross_room and not utils.room_exists(channel_id, from_room_id):
+                return False, ECodes.NO_SUCH_ROOM, 'origin room %s does not exist' % from_room_id
 
             if not utils.is_user_in_room(user_id, room_id):
-                logger.warning('user "%s" is not in room "%s' % (user_id, room_id))
-                if from_room_id is None:
+                logger.warning('user "%s" is not in room "%s"', user_id, room_id)
+                if not is_cross_room:
                     return False, ECodes.USER_NOT_IN_ROOM, 'user is not in target room'
                 if not utils.is_user_in_room(user_id, from_room_id):
                     return False, ECodes.USER_NOT_IN_ROOM, 'user is not in origin room, cannot send message from there'
@@ -91,11 +121,9 @@ class RequestValidator(BaseValidator):
                            'user not allowed to send cross-room msg from %s to %s' % (from_room_id, room_id)
 
         elif object_type == 'private':
-            channel_id = None
-            if hasattr(activity, 'object') and hasattr(activity.object, 'url'):
-                channel_id = activity.object.url
+            channel_id = getattr(obj, 'url', None)
 
-            if channel_id is None or len(channel_id.strip()) == 0:
+            if _blank(channel_id):
                 try:
                     channel_id = utils.get_channel_for_room(room_id)
                 except NoSuchRoomException:
@@ -163,6 +191,7 @@ class RequestValidator(BaseValidator):
 
     def on_login(self, activity: Activity) -> (bool, int, str):
         user_id = activity.actor.id
+        session = environ.env.session
 
         is_banned, duration = utils.is_banned_globally(user_id)
         if is_banned:
@@ -172,27 +201,26 @@ class RequestValidator(BaseValidator):
             environ.env.emit(
                 'gn_banned', json_act, json=True, room=user_id, broadcast=False, include_self=True, namespace='/ws')
 
-            logger.info('user %s is banned from chatting for: %ss' % (user_id, duration))
+            logger.info('user %s is banned from chatting for: %ss', user_id, duration)
             return False, ECodes.USER_IS_BANNED, 'user %s is banned from chatting for: %ss' % (user_id, duration)
 
-        if hasattr(activity.actor, 'attachments') and activity.actor.attachments is not None:
-            for attachment in activity.actor.attachments:
-                environ.env.session[attachment.object_type] = attachment.content
+        attachments = getattr(activity.actor, 'attachments', None)
+        if attachments is not None:
+            session.update({attachment.object_type: attachment.content for attachment in attachments})
 
-        if SessionKeys.token.value not in environ.env.session:
-            logger.warning('no token in session when logging in for user id %s' % str(user_id))
+        if SessionKeys.token.value not in session:
+            logger.warning('no token in session when logging in for user id %s', user_id)
             return False, ECodes.NO_USER_IN_SESSION, 'no token in session'
 
-        token = environ.env.session.get(SessionKeys.token.value)
-        is_valid, error_msg, session = self.validate_login(user_id, token)
+        token = session.get(SessionKeys.token.value)
+        is_valid, error_msg, user_session = self.validate_login(user_id, token)
 
         if not is_valid:
-            logger.warning('login is not valid for user id %s: %s' % (str(user_id), str(error_msg)))
+            logger.warning('login is not valid for user id %s: %s', user_id, error_msg)
             environ.env.stats.incr('on_login.failed')
             return False, ECodes.NOT_ALLOWED, error_msg
 
-        for session_key, session_value in session.items():
-            environ.env.session[session_key] = session_value
+        session.update(user_session)
 
         return True, None, None
 
@@ -218,8 +246,9 @@ class RequestValidator(BaseValidator):
         return False, ECodes.NOT_ALLOWED, 'user %s is not allowed to remove the room' % str(user_id)
 
     def on_disconnect(self, activity: Activity) -> (bool, int, str):
-        user_id = environ.env.session.get(SessionKeys.user_id.value)
-        user_name = environ.env.session.get(SessionKeys.user_name.value)
+        session = environ.env.session
+        user_id = session.get(SessionKeys.user_id.value)
+        user_name = session.get(SessionKeys.user_name.value)
         if user_id is None or not isinstance(user_id, str) or user_name is None:
             return False, ECodes.NO_USER_IN_SESSION, 'no user in session, not connected'
         return True, None, None
@@ -236,8 +265,7 @@ class RequestValidator(BaseValidator):
         try:
             activity.target.display_name = utils.get_user_name_for(activity.target.id)
         except Exception as e:
-            logger.warning('could not get username for id %s: %s' % (str(activity.target.id), str(e)))
-            logger.exception(traceback.format_exc(e))
+            logger.exception('could not get username for id %s: %s', activity.target.id, str(e))
             return False, ECodes.NO_SUCH_USER, 'no such user %s' % activity.target.id
 
         if not utils.is_base64(activity.object.content):
@@ -250,19 +278,19 @@ class RequestValidator(BaseValidator):
         return True, None, None
 
     def on_ban(self, activity: Activity) -> (bool, int, str):
-        room_id = activity.target.id
-        target_type = activity.target.object_type
+        target, obj = activity.target, activity.object
+        room_id = target.id
+        target_type = target.object_type
         user_id = activity.actor.id
-        kicked_id = activity.object.id
-        ban_duration = activity.object.summary
+        kicked_id = obj.id
+        ban_duration = obj.summary
 
         is_global_ban = target_type == 'global' or room_id is None or room_id == ''
 
         channel_id = None
         if not is_global_ban:
-            if hasattr(activity, 'object') and hasattr(activity.object, 'url'):
-                channel_id = activity.object.url
-            if channel_id is None or len(channel_id.strip()) == 0:
+            channel_id = getattr(obj, 'url', None)
+            if _blank(channel_id):
                 channel_id = utils.get_channel_for_room(room_id)
 
         try:
@@ -270,36 +298,37 @@ class RequestValidator(BaseValidator):
         except ValueError as e:
             return False, ECodes.INVALID_BAN_DURATION, 'invalid ban duration: %s' % str(e)
 
-        if not is_global_ban and room_id is not None and len(room_id.strip()) > 0:
+        if not is_global_ban and not _blank(room_id):
             try:
                 utils.get_room_name(room_id)
             except NoSuchRoomException as e:
                 return False, ECodes.NO_SUCH_ROOM, 'no room found for uuid: %s' % str(e)
 
-        if kicked_id is None or kicked_id.strip() == '':
+        if _blank(kicked_id):
             return False, ECodes.MISSING_OBJECT_ID, 'got blank user id, can not ban'
 
         if not is_global_ban and not utils.room_exists(channel_id, room_id):
             return False, ECodes.NO_SUCH_ROOM, 'no room with id "%s" exists' % room_id
 
-        if utils.is_super_user(user_id) or utils.is_global_moderator(user_id):
+        roles = utils.get_roles(user_id, channel_id, room_id)
+        if roles & _GLOBAL_ROLES:
             return True, None, None
 
-        if utils.is_super_user(kicked_id) or utils.is_global_moderator(kicked_id):
+        if utils.get_roles(kicked_id) & _GLOBAL_ROLES:
             return False, ECodes.NO_SUCH_ROOM, 'not allowed to kick super users or global mobs'
 
-        if not is_global_ban:
-            if not utils.is_owner(room_id, user_id):
-                return False, ECodes.NOT_ALLOWED, 'only owners can ban'
-        elif not utils.is_admin(channel_id, user_id):
+        if is_global_ban and not roles & RoleFlags.ADMIN:
             return False, ECodes.NOT_ALLOWED, 'only admins, super users and global mods can do global bans'
+        if not is_global_ban and not roles & RoleFlags.OWNER:
+            return False, ECodes.NOT_ALLOWED, 'only owners can ban'
 
         return True, None, None
 
     def on_request_admin(self, activity: Activity) -> (bool, int, str):
+        session = environ.env.session
         activity.actor = Actor({
-            'id': str(environ.env.session.get(SessionKeys.user_id.value)),
-            'displayName': environ.env.session.get(SessionKeys.user_name.value)
+            'id': str(session.get(SessionKeys.user_id.value)),
+            'displayName': session.get(SessionKeys.user_name.value)
         })
 
         room_id = activity.target.id
@@ -307,7 +336,7 @@ class RequestValidator(BaseValidator):
         admin_room_id = utils.get_admin_room()
 
         if admin_room_id is None or len(admin_room_id.strip()) == 0:
-            logger.error('no admin room found for channel "%s"' % channel_id)
+            logger.error('no admin room found for channel "%s"', channel_id)
             return False, ECodes.NO_ADMIN_ROOM_FOUND, 'no admin room for this channel'
         return True, None, None
 
@@ -356,14 +385,17 @@ class RequestValidator(BaseValidator):
         # validate all acls before actually changing anything
         acls = activity.object.attachments
         all_available_acls_types = environ.env.config.get(ConfigKeys.ACL)['available']['acls']
+        all_api_actions = ApiActions.all_api_actions
+        is_acl_valid = validation.acl.is_acl_valid
+
         for acl in acls:
             if acl.object_type not in all_available_acls_types:
                 return False, ECodes.INVALID_ACL_TYPE, 'invalid acl type "%s"' % acl.object_type
 
-            if acl.summary is None or acl.summary not in ApiActions.all_api_actions:
+            if acl.summary is None or acl.summary not in all_api_actions:
                 return False, ECodes.INVALID_ACL_ACTION, 'invalid api action "%s"' % acl.summary
 
-            is_valid, error_msg = validation.acl.is_acl_valid(acl.object_type, acl.content)
+            is_valid, error_msg = is_acl_valid(acl.object_type, acl.content)
             if not is_valid:
                 return False, ECodes.INVALID_ACL_VALUE, 'invalid acl value "%s" for type "%s": %s' % \
                        (acl.content, acl.object_type, error_msg)
@@ -402,11 +434,11 @@ class RequestValidator(BaseValidator):
             try:
                 user_name = utils.get_user_name_for(user_id)
             except NoSuchUserException:
-                logger.error('could not get username for user id %s' % user_id)
+                logger.error('could not get username for user id %s', user_id)
 
             logger.warning(
-                'user "%s" (%s) is not online, not joining room "%s" (%s)!' %
-                (user_name, user_id, room_name, room_id))
+                'user "%s" (%s) is not online, not joining room "%s" (%s)!',
+                user_name, user_id, room_name, room_id)
             return False, ECodes.NOT_ONLINE, 'user is not online'
 
         if utils.is_super_user(user_id) or utils.is_global_moderator(user_id):
@@ -450,7 +482,8 @@ class RequestValidator(BaseValidator):
         return True, None, None
 
     def on_leave(self, activity: Activity) -> (bool, int, str):
-        if not hasattr(activity, 'target') or not hasattr(activity.target, 'id'):
+        target = getattr(activity, 'target', None)
+        if target is None or getattr(target, 'id', None) is None:
             return False, ECodes.MISSING_TARGET_ID, 'room_id is None when trying to leave room'
         return True, None, None
 
@@ -462,7 +495,7 @@ class RequestValidator(BaseValidator):
             return False, ECodes.MISSING_OBJECT_URL, 'need channel ID to list rooms'
 
         channel_id = activity.object.url
-        if channel_id is None or channel_id == '':
+        if _blank(channel_id):
             return False, ECodes.MISSING_OBJECT_URL, 'need channel ID to list rooms'
 
         user_id = activity.actor.id
@@ -475,7 +508,7 @@ class RequestValidator(BaseValidator):
                 'gn_banned', json_act, json=True, room=user_id, broadcast=False, include_self=True, namespace='/ws')
 
             environ.env.disconnect()
-            logger.info('user %s is banned from chatting for: %ss' % (user_id, duration))
+            logger.info('user %s is banned from chatting for: %ss', user_id, duration)
             return False, ECodes.USER_IS_BANNED, json_act
 
         activity.target = Target({'objectType': 'channel'})
@@ -515,7 +548,7 @@ class RequestValidator(BaseValidator):
     def on_history(self, activity: Activity) -> (bool, int, str):
         room_id = activity.target.id
 
-        if room_id is None or room_id.strip() == '':
+        if _blank(room_id):
             return False, ECodes.MISSING_TARGET_ID, 'invalid target id'
 
         try:
@@ -531,15 +564,15 @@ class RequestValidator(BaseValidator):
 
         return True, None, None
 
-    def _can_be_invisible(self, user_id: str):
+    def _can_be_invisible(self, user_id: str) -> bool:
         if environ.env.config.get(ConfigKeys.INVISIBLE_UNRESTRICTED, default=False):
             return True
         if utils.is_super_user(user_id) or utils.is_global_moderator(user_id):
             return True
         return False
 
-    def _check_status(self, user_id, status: str) -> (bool, int, str):
-        if status not in ['online', 'offline', 'invisible']:
+    def _check_status(self, user_id: str, status: str) -> (bool, int, str):
+        if status not in _VALID_STATUSES:
             return False, ECodes.INVALID_STATUS, 'invalid status {}'.format(str(status))
         if status == 'invisible' and not self._can_be_invisible(user_id):
             return False, ECodes.NOT_ALLOWED, 'only ops can be invisible'
@@ -547,8 +580,9 @@ class RequestValidator(BaseValidator):
 
     def on_status(self, activity: Activity) -> (bool, int, str):
         status = activity.verb
-        user_name = environ.env.session.get(SessionKeys.user_name.value, None)
-        user_id = environ.env.session.get(SessionKeys.user_id.value, None)
+        session = environ.env.session
+        user_name = session.get(SessionKeys.user_name.value, None)
+        user_id = session.get(SessionKeys.user_id.value, None)
 
         if user_name is None:
             return False, ECodes.NO_USER_IN_SESSION, 'no user name in session'
@@ -557,7 +591,7 @@ class RequestValidator(BaseValidator):
         if not is_valid:
             return False, ECodes.NOT_ALLOWED, error_msg
 
-        if status not in ['online', 'offline', 'invisible']:
+        if status not in _VALID_STATUSES:
             return False, ECodes.INVALID_STATUS, 'invalid status %s' % str(status)
 
         if status == 'invisible' and not self._can_be_invisible(user_id):
@@ -584,7 +618,7 @@ class RequestValidator(BaseValidator):
         room_id = activity.target.id
         user_id = activity.object.id
 
-        if room_id is None or room_id.strip() == '':
+        if _blank(room_id):
             return False, ECodes.MISSING_TARGET_ID, 'got blank room id, can not kick'
 
         try:
@@ -592,7 +626,7 @@ class RequestValidator(BaseValidator):
         except NoSuchRoomException:
             return False, ECodes.NO_SUCH_ROOM, 'no room with id "%s" exists' % room_id
 
-        if user_id is None or user_id.strip() == '':
+        if _blank(user_id):
             return False, ECodes.MISSING_TARGET_DISPLAY_NAME, 'got blank user id, can not kick'
 
         if utils.is_super_user(user_id) or utils.is_global_moderator(user_id):
@@ -681,41 +715,43 @@ class RequestValidator(BaseValidator):
     def on_create(self, activity: Activity) -> (bool, int, str):
         if not hasattr(activity, 'object') or not hasattr(activity.object, 'url'):
             return False, ECodes.MISSING_OBJECT_URL, 'no channel id set'
-        if not hasattr(activity.target, 'display_name'):
+
+        target, obj = activity.target, activity.object
+        if not hasattr(target, 'display_name'):
             return False, ECodes.MISSING_TARGET_DISPLAY_NAME, 'no room name set'
 
-        room_name = activity.target.display_name
-        channel_id = activity.object.url
+        room_name = target.display_name
+        channel_id = obj.url
 
         if not hasattr(activity, 'actor') or not hasattr(activity.actor, 'id'):
             return False, ECodes.MISSING_ACTOR_ID, 'need actor.id (user uuid)'
 
         try:
-            activity.object.display_name = utils.get_channel_name(channel_id)
+            obj.display_name = utils.get_channel_name(channel_id)
         except NoSuchChannelException:
             return False, ECodes.NO_SUCH_CHANNEL, 'channel does not exist'
 
-        if room_name is None or room_name.strip() == '':
+        if _blank(room_name):
             return False, ECodes.MISSING_TARGET_DISPLAY_NAME, 'got blank room name, can not create'
 
         if not utils.is_base64(room_name):
             return False, ECodes.NOT_BASE64, 'invalid room name, not base64 encoded'
         room_name = utils.b64d(room_name)
 
-        if not environ.env.db.channel_exists(channel_id):
+        db = environ.env.db
+        if not db.channel_exists(channel_id):
             return False, ECodes.NO_SUCH_CHANNEL, 'channel does not exist'
 
         if utils.room_name_restricted(room_name):
             return False, ECodes.ROOM_NAME_RESTRICTED, 'restricted room name'
 
-        if environ.env.db.room_name_exists(channel_id, room_name):
+        if db.room_name_exists(channel_id, room_name):
             return False, ECodes.ROOM_ALREADY_EXISTS, 'a room with that name already exists'
 
-        if not hasattr(activity.target, 'object_type') or \
-                activity.target.object_type is None or \
-                len(str(activity.target.object_type).strip()) == 0:
+        object_type = getattr(target, 'object_type', None)
+        if object_type is None or len(str(object_type).strip()) == 0:
             # for acl validation to know we're trying to create a room
-            activity.target.object_type = 'room'
+            target.object_type = 'room'
 
         channel_acls = utils.get_acls_in_channel_for_action(channel_id, ApiActions.CREATE)
         is_valid, msg = validation.acl.validate_acl_for_action(
@@ -726,6 +762,17 @@ class RequestValidator(BaseValidator):
 
         return True, None, None
 
-    def on_test(self, activity: Activity):
+    def on_test(self, activity: Activity) -> (bool, int, str):
         """ only used for testing decorators """
         return True, None, None
+
+
+# only wrap the validators when profiling, so there's no overhead otherwise
+if DINO_PROFILE is not None and DINO_PROFILE.lower() in {'1', 'true', 'yes'}:
+    for _name in [name for name in dir(RequestValidator) if name.startswith('on_')]:
+        setattr(RequestValidator, _name, _timed(_name, getattr(RequestValidator, _name)))
+
+# resolved once at import so the request decorator doesn't need a getattr() per event
+RequestValidator.HANDLERS = {
+    name: getattr(RequestValidator, name) for name in dir(RequestValidator) if name.startswith('on_')
+}
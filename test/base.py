@@ -120,6 +120,19 @@ class BaseTest(unittest.TestCase):
     FAKE_CHECKED = 'n'
     COUNTRY = 'cn'
     CITY = 'Shanghai'
+    TOKEN = '66968fad-2336-40c9-bc6d-0ecbcd91f4da'
+
+    # (objectType, content) attachments for the login activity, built once instead of per call
+    LOGIN_INFOS = (
+        ('gender', GENDER),
+        ('age', AGE),
+        ('membership', MEMBERSHIP),
+        ('fake_checked', FAKE_CHECKED),
+        ('has_webcam', HAS_WEBCAM),
+        ('country', COUNTRY),
+        ('city', CITY),
+        ('token', TOKEN)
+    )
 
     users_in_room = dict()
 
@@ -218,7 +231,7 @@ class BaseTest(unittest.TestCase):
             'has_webcam': BaseTest.HAS_WEBCAM,
             'city': BaseTest.CITY,
             'country': BaseTest.COUNTRY,
-            'token': '66968fad-2336-40c9-bc6d-0ecbcd91f4da'
+            'token': BaseTest.TOKEN
         }
 
         environ.env.config = environ.ConfigDict()
@@ -349,20 +362,19 @@ class BaseTest(unittest.TestCase):
         environ.env.spam = MockSpam()
         environ.env.cache = CacheAllMiss()
 
-        environ.env.auth.redis.flushall()
-        environ.env.storage.redis.flushall()
-        environ.env.db.redis.flushall()
         environ.env.cache._flushall()
 
-        environ.env.auth.redis.hmset(RedisKeys.auth_key(BaseTest.USER_ID), self.session)
-        environ.env.redis.hset(RedisKeys.room_name_for_id(), BaseTest.ROOM_ID, BaseTest.ROOM_NAME)
-        environ.env.redis.sadd(RedisKeys.non_ephemeral_rooms(), BaseTest.ROOM_ID)
-        environ.env.redis.hset(RedisKeys.channels(), BaseTest.CHANNEL_ID, BaseTest.CHANNEL_NAME)
-        environ.env.db.redis.hset(RedisKeys.channels(), BaseTest.CHANNEL_ID, BaseTest.CHANNEL_NAME)
-        environ.env.db.redis.hset(RedisKeys.auth_key(BaseTest.USER_ID), SessionKeys.user_name.value, BaseTest.USER_NAME)
-        environ.env.db.redis.hset(RedisKeys.channel_for_rooms(), BaseTest.ROOM_ID, BaseTest.CHANNEL_ID)
-        environ.env.db.redis.hset(RedisKeys.user_names(), BaseTest.USER_ID, BaseTest.USER_NAME)
-        environ.env.db.redis.delete(RedisKeys.room_acl(BaseTest.ROOM_ID))
+        # auth, storage and db all share the same redis instance, so reset and populate it in one round trip
+        pipe = environ.env.redis.pipeline()
+        pipe.flushall()
+        pipe.hmset(RedisKeys.auth_key(BaseTest.USER_ID), self.session)
+        pipe.hset(RedisKeys.room_name_for_id(), BaseTest.ROOM_ID, BaseTest.ROOM_NAME)
+        pipe.sadd(RedisKeys.non_ephemeral_rooms(), BaseTest.ROOM_ID)
+        pipe.hset(RedisKeys.channels(), BaseTest.CHANNEL_ID, BaseTest.CHANNEL_NAME)
+        pipe.hset(RedisKeys.auth_key(BaseTest.USER_ID), SessionKeys.user_name.value, BaseTest.USER_NAME)
+        pipe.hset(RedisKeys.channel_for_rooms(), BaseTest.ROOM_ID, BaseTest.CHANNEL_ID)
+        pipe.hset(RedisKeys.user_names(), BaseTest.USER_ID, BaseTest.USER_NAME)
+        pipe.execute()
 
         environ.env.render_template = BaseTest._render_template
         environ.env.emit = BaseTest._emit
@@ -612,20 +624,11 @@ class BaseTest(unittest.TestCase):
             if 'image' in skip:
                 del data['actor']['image']
 
-        infos = {
-            'gender': BaseTest.GENDER,
-            'age': BaseTest.AGE,
-            'membership': BaseTest.MEMBERSHIP,
-            'fake_checked': BaseTest.FAKE_CHECKED,
-            'has_webcam': BaseTest.HAS_WEBCAM,
-            'country': BaseTest.COUNTRY,
-            'city': BaseTest.CITY,
-            'token': '66968fad-2336-40c9-bc6d-0ecbcd91f4da'
-        }
-
-        for key, val in infos.items():
-            if skip is None or key not in skip:
-                data['actor']['attachments'].append({'objectType': key, 'content': val})
+        data['actor']['attachments'] = [
+            {'objectType': key, 'content': val}
+            for key, val in BaseTest.LOGIN_INFOS
+            if skip is None or key not in skip
+        ]
 
         return data
 
@@ -112,6 +112,34 @@ class CacheRedisTest(TestCase):
         self.assertEqual(timestamp, _time)
         self.assertEqual(CacheRedisTest.USER_NAME, _name)
 
+    def test_get_global_ban_timestamp_kept_in_memory_after_redis_lookup(self):
+        timestamp = str(int((datetime.utcnow() + timedelta(seconds=5*60)).timestamp()))
+        duration = '5m'
+        self.cache.set_global_ban_timestamp(CacheRedisTest.USER_ID, duration, timestamp, CacheRedisTest.USER_NAME)
+
+        key = RedisKeys.banned_users()
+        cache_key = '%s-%s' % (key, CacheRedisTest.USER_ID)
+        self.cache._del(cache_key)
+        self.assertIsNone(self.cache._get(cache_key))
+
+        self.cache.get_global_ban_timestamp(CacheRedisTest.USER_ID)
+        self.assertEqual('%s|%s|%s' % (duration, timestamp, CacheRedisTest.USER_NAME), self.cache._get(cache_key))
+
+        expires_at, _ = self.cache.cache.vals[cache_key]
+        self.assertLessEqual(expires_at - datetime.utcnow().timestamp(), 2)
+
+    def test_get_global_ban_timestamp_not_banned_kept_in_memory(self):
+        key = RedisKeys.banned_users()
+        cache_key = '%s-%s' % (key, CacheRedisTest.USER_ID)
+        self.assertEqual((None, None, None), self.cache.get_global_ban_timestamp(CacheRedisTest.USER_ID))
+
+        # a ban set on another node only updates redis; this node won't see it until the memory cache expires
+        self.cache.redis.hset(key, CacheRedisTest.USER_ID, '5m|1234|%s' % CacheRedisTest.USER_NAME)
+        self.assertEqual((None, None, None), self.cache.get_global_ban_timestamp(CacheRedisTest.USER_ID))
+
+        expires_at, _ = self.cache.cache.vals[cache_key]
+        self.assertLessEqual(expires_at - datetime.utcnow().timestamp(), 2)
+
     def test_get_room_id_for_name_after_expired(self):
         self.cache.set_room_id_for_name(CacheRedisTest.CHANNEL_ID, CacheRedisTest.ROOM_NAME, CacheRedisTest.ROOM_ID)
         self.assertEqual(
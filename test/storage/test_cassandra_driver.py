@@ -0,0 +1,83 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from collections import namedtuple
+from unittest.mock import patch
+
+from dino.storage.cassandra_driver import Driver
+from dino.storage.cassandra_driver import StatementKeys
+
+__author__ = 'Oscar Eriksson <oscar.eriks@gmail.com>'
+
+Row = namedtuple('Row', ['message_id', 'body', 'target_id', 'from_user_id', 'sent_time', 'time_stamp'])
+
+
+class FakeResultSet(object):
+    def __init__(self, rows):
+        self.current_rows = rows
+
+
+class FakeStatement(object):
+    def bind(self, params):
+        return params
+
+
+class FakeSession(object):
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = list()
+
+    def execute(self, statement):
+        self.executed.append(statement)
+        return FakeResultSet(self.rows)
+
+
+class DriverMsgsDeleteTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            Row('1', 'first', 'room', 'user', 'sent1', 1),
+            Row('2', 'second', 'room', 'user', 'sent2', 2),
+        ]
+        self.session = FakeSession(self.rows)
+        self.driver = Driver(self.session, 'testing', 'SimpleStrategy', 1)
+        self.driver.statements[StatementKeys.msgs_select_all_in] = FakeStatement()
+        self.driver.statements[StatementKeys.msg_update] = 'update'
+
+    def test_msgs_delete_one_select_and_one_batch(self):
+        with patch('dino.storage.cassandra_driver.BatchStatement') as batch_class:
+            self.driver.msgs_delete(['1', '2', '1'])
+
+        batch = batch_class.return_value
+        self.assertEqual(2, len(self.session.executed))
+        self.assertIs(batch, self.session.executed[1])
+        batch.add.assert_any_call('update', ('', True, 'room', 'user', 'sent1', 1))
+        batch.add.assert_any_call('update', ('', True, 'room', 'user', 'sent2', 2))
+        self.assertEqual(2, batch.add.call_count)
+
+    def test_msgs_delete_keeps_body(self):
+        with patch('dino.storage.cassandra_driver.BatchStatement') as batch_class:
+            self.driver.msgs_delete(['1', '2'], clear_body=False)
+
+        batch_class.return_value.add.assert_any_call('update', ('first', True, 'room', 'user', 'sent1', 1))
+
+    def test_msgs_delete_no_rows(self):
+        self.session.rows = list()
+        with patch('dino.storage.cassandra_driver.BatchStatement') as batch_class:
+            self.driver.msgs_delete(['1'])
+
+        self.assertEqual(1, len(self.session.executed))
+        batch_class.return_value.add.assert_not_called()
+
+    def test_msgs_delete_empty(self):
+        self.driver.msgs_delete(list())
+        self.assertEqual(0, len(self.session.executed))
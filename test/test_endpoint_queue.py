@@ -0,0 +1,130 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from unittest.mock import patch
+
+from dino.endpoint import queue
+from dino.endpoint.queue import QueueHandler
+from dino.endpoint.queue import DELETE_MESSAGES_BATCH_SIZE
+
+__author__ = 'Oscar Eriksson <oscar.eriks@gmail.com>'
+
+
+class FakeStorage(object):
+    """
+    storage without delete_messages(), like the redis storage
+    """
+    def __init__(self, failing_ids=None):
+        self.failing_ids = failing_ids or set()
+        self.deleted = list()
+
+    def delete_message(self, message_id: str, clear_body=True):
+        if message_id in self.failing_ids:
+            raise RuntimeError('could not delete %s' % message_id)
+        self.deleted.append(message_id)
+
+
+class FakeBatchStorage(FakeStorage):
+    def __init__(self, failing_ids=None, batch_fails=False):
+        super(FakeBatchStorage, self).__init__(failing_ids)
+        self.batch_fails = batch_fails
+        self.batches = list()
+
+    def delete_messages(self, message_ids: list, clear_body=True):
+        if self.batch_fails:
+            raise RuntimeError('could not delete batch')
+        self.batches.append(list(message_ids))
+        self.deleted.extend(message_ids)
+
+
+class FakeEnv(object):
+    def __init__(self, storage):
+        self.storage = storage
+        self.captured = list()
+
+    def capture_exception(self, exc_info):
+        self.captured.append(exc_info)
+
+
+class QueueDeleteMessagesTest(unittest.TestCase):
+    def handler(self, storage) -> QueueHandler:
+        self.env = FakeEnv(storage)
+        return QueueHandler(None, self.env)
+
+    def test_full_batches(self):
+        messages = [str(i) for i in range(DELETE_MESSAGES_BATCH_SIZE * 2)]
+        storage = FakeBatchStorage()
+
+        self.assertEqual((len(messages), 0), self.handler(storage).try_to_delete_messages(messages))
+        self.assertEqual([messages[:DELETE_MESSAGES_BATCH_SIZE], messages[DELETE_MESSAGES_BATCH_SIZE:]], storage.batches)
+
+    def test_partial_last_batch(self):
+        messages = [str(i) for i in range(DELETE_MESSAGES_BATCH_SIZE + 3)]
+        storage = FakeBatchStorage()
+
+        self.assertEqual((len(messages), 0), self.handler(storage).try_to_delete_messages(messages))
+        self.assertEqual([DELETE_MESSAGES_BATCH_SIZE, 3], [len(batch) for batch in storage.batches])
+
+    def test_fewer_than_one_batch(self):
+        storage = FakeBatchStorage()
+
+        self.assertEqual((2, 0), self.handler(storage).try_to_delete_messages(['1', '2']))
+        self.assertEqual([['1', '2']], storage.batches)
+
+    def test_storage_without_delete_messages_deletes_one_by_one(self):
+        messages = [str(i) for i in range(DELETE_MESSAGES_BATCH_SIZE + 3)]
+        storage = FakeStorage()
+
+        self.assertEqual((len(messages), 0), self.handler(storage).try_to_delete_messages(messages))
+        self.assertEqual(messages, storage.deleted)
+        self.assertEqual(0, len(self.env.captured))
+
+    def test_failed_batch_falls_back_to_one_by_one(self):
+        storage = FakeBatchStorage(batch_fails=True)
+
+        self.assertEqual((3, 0), self.handler(storage).try_to_delete_messages(['1', '2', '3']))
+        self.assertEqual(['1', '2', '3'], storage.deleted)
+
+    def test_fallback_errors_reported_once_per_batch(self):
+        messages = [str(i) for i in range(DELETE_MESSAGES_BATCH_SIZE + 3)]
+        failing = {messages[0], messages[1], messages[-1]}
+        storage = FakeStorage(failing_ids=failing)
+
+        with patch.object(queue.logger, 'error') as log_error:
+            self.assertEqual((len(messages) - 3, 3), self.handler(storage).try_to_delete_messages(messages))
+
+        # one report for each of the two batches, not one per failed message
+        self.assertEqual(2, log_error.call_count)
+        self.assertEqual(2, len(self.env.captured))
+
+
+class QueueKickFromRoomsTest(unittest.TestCase):
+    def setUp(self):
+        self.env = FakeEnv(FakeStorage())
+        self.handler = QueueHandler(None, self.env)
+        self.kicked = list()
+
+    def kick(self, data, activity, room_id, user_id, user_sids, namespace, published=None):
+        if room_id == 'bad-room':
+            raise RuntimeError('could not kick')
+        self.kicked.append(room_id)
+
+    def test_one_failing_room_does_not_stop_the_others(self):
+        self.handler.kick = self.kick
+
+        with patch.object(queue.logger, 'error') as log_error:
+            self.handler.kick_from_rooms({}, None, ['room-1', 'bad-room', 'room-2'], 'user', ['sid'], '/ws')
+
+        self.assertEqual({'room-1', 'room-2'}, set(self.kicked))
+        self.assertEqual(1, log_error.call_count)
+        self.assertEqual(1, len(self.env.captured))
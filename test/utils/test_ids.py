@@ -0,0 +1,32 @@
+import os
+import eventlet
+
+from unittest import TestCase
+from unittest.mock import patch
+from uuid import UUID
+
+from dino.utils.ids import next_id
+from dino.utils.ids import IDS_PER_BUFFER
+
+
+class IdsTest(TestCase):
+    def test_next_id_is_uuid4(self):
+        the_id = next_id()
+        self.assertEqual(4, UUID(the_id).version)
+        self.assertEqual(the_id, str(UUID(the_id)))
+
+    def test_next_id_unique_across_buffers(self):
+        ids = [next_id() for _ in range(IDS_PER_BUFFER * 3)]
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_next_id_buffer_shared_between_green_threads(self):
+        # same as after eventlet.monkey_patch() in app.py etc., where thread locals are local to each green thread
+        green_ids = eventlet.import_patched('dino.utils.ids')
+        pool = eventlet.GreenPool()
+
+        with patch.object(green_ids.os, 'urandom', wraps=os.urandom) as urandom:
+            ids = list(pool.imap(lambda _: green_ids.next_id(), range(IDS_PER_BUFFER)))
+
+        self.assertEqual(len(ids), len(set(ids)))
+        # at most one refill for a partly used buffer, not one read per green thread
+        self.assertLessEqual(urandom.call_count, 2)
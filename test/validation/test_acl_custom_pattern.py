@@ -12,8 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from activitystreams import parse as as_parser
-
 from unittest import TestCase
 from uuid import uuid4 as uuid
 
@@ -53,35 +51,24 @@ class CustomPatternAclValidatorTest(TestCase):
     CITY = 'Shanghai'
     TOKEN = str(uuid())
 
-    def setUp(self):
-        environ.env.session = {
-            SessionKeys.user_id.value: CustomPatternAclValidatorTest.USER_ID,
-            SessionKeys.user_name.value: CustomPatternAclValidatorTest.USER_NAME,
-            SessionKeys.age.value: CustomPatternAclValidatorTest.AGE,
-            SessionKeys.gender.value: CustomPatternAclValidatorTest.GENDER,
-            SessionKeys.membership.value: CustomPatternAclValidatorTest.MEMBERSHIP,
-            SessionKeys.image.value: CustomPatternAclValidatorTest.IMAGE,
-            SessionKeys.has_webcam.value: CustomPatternAclValidatorTest.HAS_WEBCAM,
-            SessionKeys.fake_checked.value: CustomPatternAclValidatorTest.FAKE_CHECKED,
-            SessionKeys.country.value: CustomPatternAclValidatorTest.COUNTRY,
-            SessionKeys.city.value: CustomPatternAclValidatorTest.CITY,
-            SessionKeys.token.value: CustomPatternAclValidatorTest.TOKEN
-        }
-        environ.env.config = {
-            ConfigKeys.ACL: {
-                'room': {
-                    'join': {
-                    },
-                    'message': {
-                    }
-                },
-                'available': {
-                },
-                'validation': {
-                }
-            }
-        }
-        environ.env.config = {
+    SESSION = (
+        (SessionKeys.user_id.value, USER_ID),
+        (SessionKeys.user_name.value, USER_NAME),
+        (SessionKeys.age.value, AGE),
+        (SessionKeys.gender.value, GENDER),
+        (SessionKeys.membership.value, MEMBERSHIP),
+        (SessionKeys.image.value, IMAGE),
+        (SessionKeys.has_webcam.value, HAS_WEBCAM),
+        (SessionKeys.fake_checked.value, FAKE_CHECKED),
+        (SessionKeys.country.value, COUNTRY),
+        (SessionKeys.city.value, CITY),
+        (SessionKeys.token.value, TOKEN)
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        cls.validator = AclPatternValidator()
+        cls.config = {
             ConfigKeys.ACL: {
                 'room': {
                     'join': {
@@ -128,7 +115,10 @@ class CustomPatternAclValidatorTest(TestCase):
                 }
             }
         }
-        self.validator = AclPatternValidator()
+
+    def setUp(self):
+        environ.env.session = dict(CustomPatternAclValidatorTest.SESSION)
+        environ.env.config = self.config
 
     def test_new_pattern(self):
         self.new_acl_ok('gender=f,(membership=tg_p|membership=tg),(age=34:40|age=21:25)')
@@ -237,110 +227,66 @@ class CustomPatternAclValidatorTest(TestCase):
 
     def test_tg_p_w_ok(self):
         pattern = 'gender=!w|gender=w,membership=tg_p'
-        environ.env.session[SessionKeys.gender.value] = 'w'
-        environ.env.session[SessionKeys.membership.value] = 'tg_p'
+        self.set_gender_and_membership('w', 'tg_p')
         self.true(pattern)
 
     def test_tg_p_m_ok(self):
         pattern = 'gender=!w|gender=w,membership=tg_p'
-        environ.env.session[SessionKeys.gender.value] = 'm'
-        environ.env.session[SessionKeys.membership.value] = 'tg_p'
+        self.set_gender_and_membership('m', 'tg_p')
         self.true(pattern)
 
     def test_tg_non_p_w_not_ok(self):
         pattern = 'gender=!w|gender=w,membership=tg_p'
-        environ.env.session[SessionKeys.gender.value] = 'w'
-        environ.env.session[SessionKeys.membership.value] = 'tg'
+        self.set_gender_and_membership('w', 'tg')
         self.false(pattern)
 
     def test_tg_non_p_ts_ok(self):
         pattern = 'gender=!w|gender=w,membership=tg_p'
-        environ.env.session[SessionKeys.gender.value] = 'ts'
-        environ.env.session[SessionKeys.membership.value] = 'tg'
+        self.set_gender_and_membership('ts', 'tg')
         self.true(pattern)
 
     def test_tg_multiple(self):
         pattern = 'gender=!w,membership=!tg|gender=w,membership=tg_p'
-
-        environ.env.session[SessionKeys.gender.value] = 'ts'
-        environ.env.session[SessionKeys.membership.value] = 'tg'
-        self.false(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'ts'
-        environ.env.session[SessionKeys.membership.value] = 'tg_p'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'ts'
-        environ.env.session[SessionKeys.membership.value] = 'normal'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'ts'
-        environ.env.session[SessionKeys.membership.value] = 'premium'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'ts'
-        environ.env.session[SessionKeys.membership.value] = 'vip'
-        self.true(pattern)
-
-        environ.env.session[SessionKeys.gender.value] = 'w'
-        environ.env.session[SessionKeys.membership.value] = 'tg_p'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'w'
-        environ.env.session[SessionKeys.membership.value] = 'tg'
-        self.false(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'w'
-        environ.env.session[SessionKeys.membership.value] = 'vip'
-        self.false(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'w'
-        environ.env.session[SessionKeys.membership.value] = 'normal'
-        self.false(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'w'
-        environ.env.session[SessionKeys.membership.value] = 'premium'
-        self.false(pattern)
-
-        environ.env.session[SessionKeys.gender.value] = 'm'
-        environ.env.session[SessionKeys.membership.value] = 'tg'
-        self.false(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'm'
-        environ.env.session[SessionKeys.membership.value] = 'tg_p'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'm'
-        environ.env.session[SessionKeys.membership.value] = 'vip'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'm'
-        environ.env.session[SessionKeys.membership.value] = 'normal'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'm'
-        environ.env.session[SessionKeys.membership.value] = 'premium'
-        self.true(pattern)
-
-        environ.env.session[SessionKeys.gender.value] = 'p'
-        environ.env.session[SessionKeys.membership.value] = 'tg'
-        self.false(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'p'
-        environ.env.session[SessionKeys.membership.value] = 'tg_p'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'p'
-        environ.env.session[SessionKeys.membership.value] = 'vip'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'p'
-        environ.env.session[SessionKeys.membership.value] = 'normal'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'p'
-        environ.env.session[SessionKeys.membership.value] = 'premium'
-        self.true(pattern)
-
-        environ.env.session[SessionKeys.gender.value] = 'tv'
-        environ.env.session[SessionKeys.membership.value] = 'tg'
-        self.false(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'tv'
-        environ.env.session[SessionKeys.membership.value] = 'tg_p'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'tv'
-        environ.env.session[SessionKeys.membership.value] = 'vip'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'tv'
-        environ.env.session[SessionKeys.membership.value] = 'normal'
-        self.true(pattern)
-        environ.env.session[SessionKeys.gender.value] = 'tv'
-        environ.env.session[SessionKeys.membership.value] = 'premium'
-        self.true(pattern)
+        expected_results = [
+            ('ts', 'tg', False),
+            ('ts', 'tg_p', True),
+            ('ts', 'normal', True),
+            ('ts', 'premium', True),
+            ('ts', 'vip', True),
+
+            ('w', 'tg_p', True),
+            ('w', 'tg', False),
+            ('w', 'vip', False),
+            ('w', 'normal', False),
+            ('w', 'premium', False),
+
+            ('m', 'tg', False),
+            ('m', 'tg_p', True),
+            ('m', 'vip', True),
+            ('m', 'normal', True),
+            ('m', 'premium', True),
+
+            ('p', 'tg', False),
+            ('p', 'tg_p', True),
+            ('p', 'vip', True),
+            ('p', 'normal', True),
+            ('p', 'premium', True),
+
+            ('tv', 'tg', False),
+            ('tv', 'tg_p', True),
+            ('tv', 'vip', True),
+            ('tv', 'normal', True),
+            ('tv', 'premium', True)
+        ]
+
+        for gender, membership, expected in expected_results:
+            self.set_gender_and_membership(gender, membership)
+            is_valid, _ = self.validator(self.act(), environ.env, 'custom', pattern)
+            self.assertEqual(expected, is_valid, 'gender "%s", membership "%s"' % (gender, membership))
+
+    def set_gender_and_membership(self, gender, membership):
+        environ.env.session[SessionKeys.gender.value] = gender
+        environ.env.session[SessionKeys.membership.value] = membership
 
     def false(self, pattern):
         is_valid, _ = self.validator(self.act(), environ.env, 'custom', pattern)
@@ -355,19 +301,19 @@ class CustomPatternAclValidatorTest(TestCase):
 
     def new_acl_bad(self, pattern):
         with self.assertRaises(ValidationException):
-            self.new_acl_ok('gender=f(membership=tg_p|membership=tg),(age=34:40|age=21:25)')
+            self.new_acl_ok(pattern)
 
     def act(self):
         return {
             'actor': {
-                'id': '1234'
+                'id': CustomPatternAclValidatorTest.USER_ID
             },
             'verb': 'join',
             'object': {
-                'url': str(uuid())
+                'url': CustomPatternAclValidatorTest.CHANNEL_ID
             },
             'target': {
-                'id': str(uuid()),
+                'id': CustomPatternAclValidatorTest.ROOM_ID,
                 'objectType': 'room'
             }
         }
@@ -83,6 +83,20 @@ class FakeDb(object):
     def is_global_moderator(self, user_id):
         return user_id in FakeDb._global_moderators
 
+    def get_user_roles_in(self, user_id, channel_id=None, room_id=None):
+        roles = {'global': list(), 'channel': list(), 'room': list()}
+        if self.is_super_user(user_id):
+            roles['global'].append('superuser')
+        if self.is_global_moderator(user_id):
+            roles['global'].append('globalmod')
+        if self.is_admin(channel_id, user_id):
+            roles['channel'].append('admin')
+        if self.is_owner(room_id, user_id):
+            roles['room'].append('owner')
+        if self.is_moderator(room_id, user_id):
+            roles['room'].append('moderator')
+        return roles
+
     def channel_for_room(self, room_id):
         if room_id not in FakeDb._channel_for_room:
             return None